@@ -2,9 +2,49 @@
 
 import streamlit as st
 import pandas as pd
-import numpy as np
 import streamlit.components.v1 as components
-import requests
+import os
+import time
+
+from ecolens import (
+    CHART_WIDTH_PX,
+    CHAT_TOKEN_BUDGET,
+    EXPLANATIONS_FILE,
+    ExplanationStore,
+    OcrPool,
+    OcrQueueFull,
+    PAGE_ROWS,
+    ProductNameExtractor,
+    LLMClient,
+    MIN_LOG_CONFIDENCE,
+    RESULT_COLUMNS,
+    ScanCache,
+    ScoringConfig,
+    TREND_RANGES,
+    catalog_version,
+    count_tokens,
+    file_version,
+    fit_messages,
+    image_digest,
+    iter_uploads,
+    lttb,
+    match_scan,
+    product_facts,
+    response_key,
+    scan_images,
+    stream_text,
+)
+from app_common import (
+    MATERIAL_CSV,
+    PRODUCT_CSV,
+    current_user,
+    load_history_store,
+    load_response_cache,
+    load_scored_catalog,
+    log_purchases,
+    session_history,
+)
+
 st.set_page_config(page_title="EcoLens", page_icon="🌱", layout="wide")
 st.markdown("""
 <style>
@@ -22,175 +62,64 @@ st.markdown("""
 </style>
 """, unsafe_allow_html=True)
 
-GREENER_ALTERNATIVES = {
-    "Cream": [
-        {
-            "name": "Minimalist Marula Oil Moisturizer",
-            "reason": "Uses an aluminum tube instead of a plastic jar, reducing total plastic waste."
-        },
-        {
-            "name": "Earth Rhythm Phyto Clear Moisturizer",
-            "reason": "Packaged in a reusable glass jar with lower waste impact than PET."
-        },
-        {
-            "name": "Plum Green Tea Moisturizer",
-            "reason": "Smaller packaging size means less total material used."
-        }
-    ],
-    "Body Wash": [
-        {
-            "name": "Ethique Solid Body Wash Bar",
-            "reason": "Eliminates plastic bottles entirely by using a solid bar format."
-        },
-        {
-            "name": "Earth Rhythm Body Wash Bar",
-            "reason": "Zero plastic packaging results in near-zero packaging emissions."
-        }
-    ],
-    "Sunscreen": [
-        {
-            "name": "Raw Beauty Wellness Sunscreen Stick",
-            "reason": "Paper-based packaging avoids high-energy aluminum and plastic bottles."
-        },
-        {
-            "name": "Dot & Key Sunscreen Stick",
-            "reason": "Compact solid format reduces packaging weight significantly."
-        },
-        {
-            "name": "Minimalist SPF 50 (50g)",
-            "reason": "Smaller tube uses far less material than large sunscreen bottles."
-        }
-    ],
-    "Shampoo": [
-        {
-            "name": "Ethique Shampoo Bar",
-            "reason": "Solid shampoo bar completely removes the need for plastic bottles."
-        },
-        {
-            "name": "Earth Rhythm Shampoo Bar",
-            "reason": "Lower water and carbon footprint due to zero liquid packaging."
-        },
-        {
-            "name": "Bare Anatomy Concentrated Shampoo",
-            "reason": "Concentrated formula requires a smaller bottle."
-        }
-    ]
-}
-
-
 # -----------------------------
-# Step 0: Define file paths
+# Step 1: Score the catalog (shared ecolens engine)
 # -----------------------------
-PRODUCT_CSV = "product.csv"
-MATERIAL_CSV = "material.csv"
+SCORING_CONFIG = ScoringConfig()
+
+catalog = load_scored_catalog(catalog_version(PRODUCT_CSV, MATERIAL_CSV, SCORING_CONFIG), SCORING_CONFIG)
+summary_df = catalog.summary_df
+
+
+@st.cache_resource(show_spinner=False, on_release=lambda llm: llm.close())
+def load_llm_client(api_key):
+    """
+    One OpenAI client per process and key: pooled connections reused by
+    every session and rerun, at most 8 requests in flight.
+    """
+    return LLMClient(api_key, max_concurrency=8)
+
+
+@st.cache_resource(max_entries=2, show_spinner="Indexing product names...")
+def load_name_extractor(product_version):
+    """
+    Catalog vocabulary automaton for reading OCR text. Only depends on
+    product.csv, so it is rebuilt when that file changes, not on every
+    scoring change.
+    """
+    return ProductNameExtractor(pd.read_csv(PRODUCT_CSV))
+
+
+@st.cache_resource(max_entries=2, show_spinner=False)
+def load_explanations(version):
+    """
+    Product explanations pre-generated by `python -m ecolens explain`
+    (explanations.sqlite3 next to the CSVs) for one catalog version.
+    """
+    return ExplanationStore(os.path.join(catalog.data_dir, EXPLANATIONS_FILE), version)
+
+
+@st.cache_resource(show_spinner=False)
+def load_ocr_pool():
+    """One OCR process pool for the whole server, shared by every session."""
+    return OcrPool(max_pending=8)
+
+
+@st.cache_resource(max_entries=2, show_spinner=False)
+def load_scan_cache(version):
+    """
+    Scan results for one catalog version: in-memory LRU plus
+    scan-cache.sqlite3 next to the CSVs. A new version starts clean.
+    """
+    return ScanCache(version, os.path.join(catalog.data_dir, "scan-cache.sqlite3"))
 
-# -----------------------------
-# Step 1: Read CSV files
-# -----------------------------
-products_df = pd.read_csv(PRODUCT_CSV)
-materials_df = pd.read_csv(MATERIAL_CSV)
-
-# Convert material impact dataframe to dictionary
-material_impact_dict = {}
-for _, row in materials_df.iterrows():
-    material_impact_dict[row['material']] = {
-        'carbon': row['carbon_kg_per_kg'],
-        'water': row['water_L_per_kg'],
-        'energy': row['energy_MJ_per_kg'],
-        'waste': row['waste_score']
-    }
-
-# =============================
-# MATERIAL IMPACT DICTIONARY
-# =============================
-material_impact_dict = {}
-for _, row in materials_df.iterrows():
-    material_impact_dict[row['material']] = {
-        'carbon': row['carbon_kg_per_kg'],
-        'water': row['water_L_per_kg'],
-        'energy': row['energy_MJ_per_kg'],
-        'waste': row['waste_score']  # 1–5 (higher = worse)
-    }
-
-# =============================
-# INITIALIZE RESULT COLUMNS
-# =============================
-products_df['total_carbon_kg'] = 0.0
-products_df['total_water_L'] = 0.0
-products_df['total_energy_MJ'] = 0.0
-products_df['total_waste_score'] = 0.0
-
-# =============================
-# COMPUTE ENVIRONMENTAL IMPACT
-# =============================
-for i, product in products_df.iterrows():
-    total_carbon = 0.0
-    total_water = 0.0
-    total_energy = 0.0
-    waste_scores = []
-
-    for j in range(1, 4):
-        material = product.get(f'material_{j}')
-        weight_g = product.get(f'weight_{j}_g')
-
-        if pd.isna(material) or pd.isna(weight_g):
-            continue
-
-        impact = material_impact_dict.get(material)
-        if not impact:
-            continue
-
-        weight_kg = weight_g / 1000
-
-        total_carbon += weight_kg * impact['carbon']
-        total_water += weight_kg * impact['water']
-        total_energy += weight_kg * impact['energy']
-
-        # Waste is a material-type penalty (not mass-scaled)
-        waste_scores.append(impact['waste'])
-
-    products_df.at[i, 'total_carbon_kg'] = total_carbon
-    products_df.at[i, 'total_water_L'] = total_water
-    products_df.at[i, 'total_energy_MJ'] = total_energy
-    products_df.at[i, 'total_waste_score'] = np.mean(waste_scores) if waste_scores else 0
-
-# =============================
-# NORMALIZATION CAPS (FIXED)
-# =============================
-CARBON_CAP = 0.5   # kg CO₂e
-WATER_CAP = 10.0   # liters
-ENERGY_CAP = 20.0  # MJ
-WASTE_CAP = 5.0    # max material waste score
-
-products_df['carbon_norm'] = (products_df['total_carbon_kg'] / CARBON_CAP).clip(0, 1)
-products_df['water_norm'] = (products_df['total_water_L'] / WATER_CAP).clip(0, 1)
-products_df['energy_norm'] = (products_df['total_energy_MJ'] / ENERGY_CAP).clip(0, 1)
-products_df['waste_norm'] = (products_df['total_waste_score'] / WASTE_CAP).clip(0, 1)
-
-# =============================
-# FINAL ECOSCORE (0–100)
-# =============================
-products_df['eco_score'] = (
-    (1 - products_df['carbon_norm']) * 0.35 +
-    (1 - products_df['water_norm']) * 0.25 +
-    (1 - products_df['energy_norm']) * 0.25 +
-    (1 - products_df['waste_norm']) * 0.15
-) * 100
-
-products_df['eco_score'] = products_df['eco_score'].round(1)
-
-# =============================
-# FINAL SUMMARY TABLE (REQUIRED FOR GREEN SCORE PAGE)
-# =============================
-summary_df = products_df[[
-    'name',
-    'category',
-    'total_carbon_kg',
-    'total_water_L',
-    'total_energy_MJ',
-    'total_waste_score',
-    'eco_score'
-]].copy()
+
+@st.fragment(run_every=0.5)
+def wait_for_scan(job_id):
+    """Polls the OCR pool; reruns the page once the scan is read."""
+    if load_ocr_pool().done(job_id):
+        st.rerun()
+    st.info("⏳ Reading packaging text...")
 
 
 # -------------------------
@@ -421,13 +350,7 @@ elif st.session_state.page == "GreenScore":
     st.button("← Back to Home", on_click=go, args=("Home",))
     st.title("🌿 GreenScore")    
     # Check if user clicked an alternative product
-    if "impact_history" not in st.session_state:
-        st.session_state.impact_history = pd.DataFrame(columns=[
-            "Product", "Category", "Eco Score",
-            "Carbon (kg)", "Water (L)", "Energy (MJ)", "Waste Score"
-        ])
-    if "logged_keys" not in st.session_state:
-        st.session_state.logged_keys = set()
+    session_history()  # this user's stored purchases and logged_keys
     
     # -----------------------------
     # Step 7: USER INPUT + DISPLAY
@@ -437,22 +360,113 @@ elif st.session_state.page == "GreenScore":
     image_file = st.camera_input("Take a photo of the product")
     
     if image_file:
-        image = Image.open(image_file)
+        # OCR runs on the shared process pool; this run only submits/polls
+        ocr_pool = load_ocr_pool()
+        scan_cache = load_scan_cache(catalog.version)
+        image_bytes = image_file.getvalue()
+        job_id = image_digest(image_bytes)
+        scan = st.session_state.get("scan")
+        if scan is None or scan["job"] != job_id:
+            # Seen this photo (or a near-identical re-take) before: no OCR at all
+            cached = scan_cache.get(image_bytes)
+            if cached is not None:
+                scan = st.session_state.scan = {"job": job_id, **cached}
+                st.session_state.selected_product = scan["matched_name"] or st.session_state.get("selected_product")
+            else:
+                try:
+                    ocr_pool.submit(image_bytes)
+                    scan = st.session_state.scan = {"job": job_id, "text": None}
+                except OcrQueueFull:
+                    scan = None
+                    st.warning("The scanner is busy right now. Please try again in a moment.")
+
+        if scan and scan["text"] is None and ocr_pool.done(job_id):
+            try:
+                all_text = ocr_pool.result(job_id)
+            except KeyError:
+                del st.session_state["scan"]  # dropped from the pool; resubmit
+                st.rerun()
+            except Exception as e:
+                scan.update(text="", error=str(e))
+            else:
+                with st.spinner("Identifying product..."):
+                    name_extractor = load_name_extractor(file_version(PRODUCT_CSV))
+                    scan.update(match_scan(all_text, name_extractor, catalog.fuzzy))
+                scan_cache.put(image_bytes, {k: v for k, v in scan.items() if k != "job"})
+                st.session_state.selected_product = scan["matched_name"] or st.session_state.get("selected_product")
+
+        if scan and scan["text"] is None:
+            wait_for_scan(job_id)
+        elif scan and scan.get("error"):
+            st.error(f"Couldn't read the photo: {scan['error']}")
+        elif scan and scan["matched_name"]:
+            st.success(f"Detected: {scan['matched_name']} ({scan['confidence']:.0%} match)")
+        elif scan:
+            st.warning("Couldn't match this product to the catalog. Try searching below.")
     
-        with st.spinner("Reading packaging text..."):
-            all_text = ocr_image(image)
-        
-        with st.spinner("Identifying product..."):
-            detected_name = extract_product_name(all_text)
-            matched_name, confidence = fuzzy_match_product(detected_name, summary_df)
-        
-        st.success(f"Detected: {matched_name}")
-        st.session_state.selected_product = matched_name
+    # -----------------------------
+    # BULK SCAN (shelf photos, receipts)
+    # -----------------------------
+    with st.expander("📦 Bulk scan: a folder or zip of photos"):
+        bulk_source = st.radio("Upload", ["Photos or zip", "Folder"], horizontal=True, key="bulk_source")
+        uploads = st.file_uploader(
+            "Product photos",
+            type=["jpg", "jpeg", "png", "webp", "zip"],
+            accept_multiple_files="directory" if bulk_source == "Folder" else True,
+            key=f"bulk_upload_{bulk_source}",
+        )
+    
+        if uploads and st.button("🔍 Scan all photos", use_container_width=True):
+            images = list(iter_uploads(uploads))
+            progress = st.progress(0.0, text=f"Reading {len(images)} photos...")
+            live_table = st.empty()
+            rows = []
+            # OCR runs across all cores; matches stream in as photos finish
+            for result in scan_images(images, load_name_extractor(file_version(PRODUCT_CSV)), catalog.fuzzy,
+                                      cache=load_scan_cache(catalog.version)):
+                rows.append(result)
+                progress.progress(len(rows) / len(images), text=f"{len(rows)} of {len(images)} photos read")
+                live_table.dataframe(pd.DataFrame(rows, columns=RESULT_COLUMNS), hide_index=True)
+            live_table.empty()
+            progress.empty()
+            st.session_state.bulk_results = pd.DataFrame(rows, columns=RESULT_COLUMNS).sort_values("file", ignore_index=True)
+    
+        bulk_results = st.session_state.get("bulk_results")
+        if bulk_results is not None:
+            # Tick what to log; only confident matches start ticked
+            review = st.data_editor(
+                bulk_results.assign(
+                    log=bulk_results["matched_name"].notna() & (bulk_results["confidence"] >= MIN_LOG_CONFIDENCE)
+                )[["log", *RESULT_COLUMNS]],
+                hide_index=True,
+                disabled=RESULT_COLUMNS,
+                column_config={
+                    "log": st.column_config.CheckboxColumn("log", help="Log this product as purchased"),
+                    "confidence": st.column_config.ProgressColumn("confidence", min_value=0, max_value=1),
+                },
+            )
+            matched = bulk_results["matched_name"].dropna()
+            chosen = review.loc[review["log"] & review["matched_name"].notna(), "matched_name"]
+            st.caption(
+                f"{len(matched)} of {len(bulk_results)} photos matched a catalog product; "
+                f"matches below {MIN_LOG_CONFIDENCE:.0%} confidence are left unticked"
+            )
+    
+            if len(chosen) and st.button(f"✅ Log {len(chosen)} selected products as purchased", use_container_width=True):
+                rows = summary_df.iloc[[catalog.products.row_by_name[name] for name in chosen]]
+                # Same rule as single logging: a product/score pair is logged once
+                keys = rows["name"] + "_" + rows["eco_score"].astype(str)
+                new = ~keys.isin(st.session_state.logged_keys) & ~keys.duplicated()
+                log_purchases(rows[new.to_numpy()])
+                st.session_state.logged_keys.update(keys[new])
+                if new.any():
+                    st.success(f"🎉 {int(new.sum())} products logged! Your Impact Dashboard has been updated.")
+                else:
+                    st.info("These products are already logged as purchased.")
     
     # -----------------------------
     # PRODUCT SEARCH (SINGLE SOURCE OF TRUTH)
     # -----------------------------
-    product_options = sorted(summary_df["name"].unique())
     preselected_product = None
     
     # Priority:
@@ -462,26 +476,23 @@ elif st.session_state.page == "GreenScore":
         preselected_product = st.session_state.selected_alternative
     elif "selected_product" in st.session_state:
         preselected_product = st.session_state.selected_product
+    if preselected_product not in catalog.products:
+        preselected_product = None
+    
+    # Search runs server-side: only the top matches reach the selectbox
+    query = st.text_input("🔍 Search for a product", placeholder="Start typing to search...")
+    product_options = catalog.search.suggestions(query, k=20, keep=preselected_product)
     
     # -----------------------------
     # SINGLE SELECTBOX (NO DOUBLE CLICK)
     # -----------------------------
-    if preselected_product in product_options:
-        product_input = st.selectbox(
-            "🔍 Search for a product",
-            options=product_options,
-            index=product_options.index(preselected_product),
-            key="product_selectbox",
-            placeholder="Start typing to search..."
-        )
-    else:
-        product_input = st.selectbox(
-            "🔍 Search for a product",
-            options=product_options,
-            index=None,
-            key="product_selectbox",
-            placeholder="Start typing to search..."
-        )
+    product_input = st.selectbox(
+        "Matching products",
+        options=product_options,
+        index=0 if preselected_product else None,
+        key="product_selectbox",
+        placeholder="Pick a product..."
+    )
     
     # -----------------------------
     # CLEAN UP ONE-TIME FLAGS
@@ -494,7 +505,7 @@ elif st.session_state.page == "GreenScore":
     # -----------------------------
     if product_input:
         st.session_state.selected_product = product_input
-        result = summary_df[summary_df["name"] == product_input]
+        result = catalog.products.frame(product_input)
         if result.empty:
             st.error("❌ Product not found in database.")
         else:
@@ -723,15 +734,7 @@ elif st.session_state.page == "GreenScore":
                 log_key = f"{product_input}_{r['eco_score']}"
             
                 if log_key not in st.session_state.logged_keys:
-                    st.session_state.impact_history.loc[len(st.session_state.impact_history)] = {
-                        "Product": product_input,
-                        "Category": r["category"],
-                        "Eco Score": r["eco_score"],
-                        "Carbon (kg)": r["total_carbon_kg"],
-                        "Water (L)": r["total_water_L"],
-                        "Energy (MJ)": r["total_energy_MJ"],
-                        "Waste Score": r["total_waste_score"]
-                    }
+                    log_purchases(r)
                     st.session_state.logged_keys.add(log_key)
                     st.success("🎉 Product logged! Your Impact Dashboard has been updated.")
                 else:
@@ -741,7 +744,7 @@ elif st.session_state.page == "GreenScore":
             st.subheader("🌿 Greener Alternatives")
             st.caption("Click any product to view its full eco score")
             
-            alternatives = get_greener_alternatives(product_input, summary_df, max_alternatives=5)
+            alternatives = catalog.alternatives_table.for_product(product_input, max_alternatives=5)
             
             # ✅ CASE 1: NO greener alternatives
             if not alternatives:
@@ -803,8 +806,8 @@ elif st.session_state.page == "GreenScore":
                 "how to make better purchase choices."
             )
 
-            from openai import OpenAI
-            client = OpenAI(api_key=st.secrets["OpenAIKey"])
+            llm = load_llm_client(st.secrets["OpenAIKey"])
+            response_cache = load_response_cache()
 
             # -----------------------------
             # INIT / RESET PRODUCT CHAT MEMORY
@@ -833,21 +836,19 @@ elif st.session_state.page == "GreenScore":
                             "- No lifestyle tips\n"
                             "- Be specific to THIS product\n"
                             "- Do not invent data\n\n"
-                            f"PRODUCT CONTEXT:\n"
-                            f"Name: {r['name']}\n"
-                            f"Category: {r['category']}\n"
-                            f"Eco Score: {r['eco_score']} / 100\n"
-                            f"Carbon: {r['total_carbon_kg']} kg CO₂e\n"
-                            f"Water: {r['total_water_L']} L\n"
-                            f"Energy: {r['total_energy_MJ']} MJ\n"
-                            f"Waste Score: {r['total_waste_score']}\n"
-                            f"Microplastics: {bool(int(r['microplastics']))}\n"
-                            f"Silicones: {bool(int(r['silicones']))}\n"
-                            f"Petroleum-derived: {bool(int(r['petroleum']))}"
+                            f"PRODUCT CONTEXT:\n{product_facts(r)}"
                         ),
                     }
                 ]
 
+                # The standard explanation was written ahead of time by the
+                # batch job: shown at once, live calls are left for follow-ups
+                explanation = load_explanations(catalog.version).get(r["product_id"])
+                if explanation:
+                    st.session_state.product_ai_messages.append(
+                        {"role": "assistant", "content": explanation}
+                    )
+
             # -----------------------------
             # DISPLAY CHAT
             # -----------------------------
@@ -874,15 +875,42 @@ elif st.session_state.page == "GreenScore":
                 # AI RESPONSE
                 # -----------------------------
                 with st.chat_message("assistant"):
-                    with st.spinner("Thinking about this product… 🌍"):
-                        response = client.chat.completions.create(
-                            model="gpt-4o-mini",
-                            temperature=0.4,
-                            messages=st.session_state.product_ai_messages,
+                    # A first question about a product is answered from the cache when
+                    # anyone asked it before; follow-ups depend on the conversation
+                    cache_key = None
+                    history = st.session_state.product_ai_messages[:-1]
+                    if not any(m["role"] == "user" for m in history):
+                        cache_key = response_key(
+                            product_question, [m["content"] for m in history],
+                            model="gpt-4o-mini", temperature=0.4,
                         )
+                    ai_reply = response_cache.get(cache_key) if cache_key else None
 
-                        ai_reply = response.choices[0].message.content
+                    if ai_reply is not None:
                         st.markdown(ai_reply)
+                    else:
+                        started, usage = time.perf_counter(), {}
+                        # Full history stays in the session; the request gets a token-budgeted copy
+                        prompt_messages, memory_stats = fit_messages(st.session_state.product_ai_messages)
+                        with st.spinner("Thinking about this product… 🌍"):
+                            stream = llm.chat(
+                                model="gpt-4o-mini",
+                                temperature=0.4,
+                                messages=prompt_messages,
+                                stream=True,
+                                stream_options={"include_usage": True},
+                            )
+
+                        # Render tokens as they arrive; returns the full reply
+                        ai_reply = st.write_stream(stream_text(stream, usage))
+                        if cache_key:
+                            response_cache.put(cache_key, ai_reply, time.perf_counter() - started,
+                                               usage.get("total_tokens"))
+                        if memory_stats["saved_tokens"]:
+                            st.caption(
+                                f"🧠 {memory_stats['dropped_messages']} earlier messages condensed, "
+                                f"~{memory_stats['saved_tokens']:,} prompt tokens saved"
+                            )
 
                 st.session_state.product_ai_messages.append(
                     {"role": "assistant", "content": ai_reply}
@@ -901,12 +929,12 @@ elif st.session_state.page == "GreenScore":
 elif st.session_state.page == "Chatbot":
 
     import streamlit as st
-    from openai import OpenAI
 
     # -----------------------------
-    # INIT OPENAI CLIENT
+    # OPENAI CLIENT (shared, created once per process)
     # -----------------------------
-    client = OpenAI(api_key=st.secrets["OPENAI_API_KEY"])
+    llm = load_llm_client(st.secrets["OPENAI_API_KEY"])
+    response_cache = load_response_cache()
 
     # -----------------------------
     # PAGE SETUP
@@ -953,20 +981,71 @@ elif st.session_state.page == "Chatbot":
         # OPENAI RESPONSE
         # -----------------------------
         with st.chat_message("assistant"):
-            with st.spinner("Thinking 🌍"):
-                response = client.chat.completions.create(
-                    model="gpt-4o-mini",
-                    messages=st.session_state.messages,
-                    temperature=0.6
-                )
-
-                assistant_reply = response.choices[0].message.content
+            # Lookup questions ("eco score of X", "greenest sunscreen") are
+            # answered from the catalog in milliseconds, without the API
+            assistant_reply = catalog.intents.answer(user_input)
+            if assistant_reply is not None:
                 st.markdown(assistant_reply)
+                st.caption("⚡ Answered instantly from the EcoLens catalog")
+            else:
+                # Only the few catalog records relevant to the question go into the prompt
+                catalog_context = catalog.retrieval.context(user_input, k=4)
+
+                # Opening questions are answered from the cache when anyone asked
+                # them before; follow-ups depend on the conversation so far
+                cache_key = None
+                if len(st.session_state.messages) == 2:
+                    cache_key = response_key(
+                        user_input, [st.session_state.messages[0]["content"], catalog_context],
+                        model="gpt-4o-mini", temperature=0.6
+                    )
+                assistant_reply = response_cache.get(cache_key) if cache_key else None
+
+                if assistant_reply is not None:
+                    st.markdown(assistant_reply)
+                else:
+                    started, usage = time.perf_counter(), {}
+                    # Full history stays in the session; the request gets a token-budgeted copy
+                    prompt_messages, memory_stats = fit_messages(
+                        st.session_state.messages, budget=CHAT_TOKEN_BUDGET - count_tokens(catalog_context)
+                    )
+                    if catalog_context:
+                        prompt_messages.insert(1, {
+                            "role": "system",
+                            "content": "EcoLens catalog data (use it when it answers the question):\n" + catalog_context
+                        })
+                    with st.spinner("Thinking 🌍"):
+                        stream = llm.chat(
+                            model="gpt-4o-mini",
+                            messages=prompt_messages,
+                            temperature=0.6,
+                            stream=True,
+                            stream_options={"include_usage": True}
+                        )
+
+                    # Render tokens as they arrive; returns the full reply
+                    assistant_reply = st.write_stream(stream_text(stream, usage))
+                    if cache_key:
+                        response_cache.put(cache_key, assistant_reply, time.perf_counter() - started,
+                                           usage.get("total_tokens"))
+                    if memory_stats["saved_tokens"]:
+                        st.caption(
+                            f"🧠 {memory_stats['dropped_messages']} earlier messages condensed, "
+                            f"~{memory_stats['saved_tokens']:,} prompt tokens saved"
+                        )
 
         st.session_state.messages.append(
             {"role": "assistant", "content": assistant_reply}
         )
 
+    cache_stats = response_cache.stats()
+    if cache_stats["hits"]:
+        st.caption(
+            f"⚡ Answer cache: {cache_stats['hits']} repeat questions answered instantly "
+            f"({cache_stats['hit_rate']:.0%}), {cache_stats['latency_saved_s']:.0f}s and "
+            f"~{cache_stats['tokens_saved']:,} tokens saved"
+        )
+
 
 
 
@@ -984,24 +1063,28 @@ elif st.session_state.page == "Impact Dashboard":
     # =============================
     # REQUIRE HISTORY
     # =============================
-    if "impact_history" not in st.session_state or st.session_state.impact_history.empty:
+    if not session_history():
         st.info("Analyse products to start building your impact story 🌱")
         st.stop()
 
-    history = st.session_state.impact_history.copy()
+    # Read-only view of the log; nothing below modifies it
+    history = st.session_state.impact_history.frame()
+    # Running totals kept by the log as purchases are added: no full-history scans
+    stats = st.session_state.impact_history.aggregates()
+    history_store, user = load_history_store(), current_user()
 
     st.divider()
 
     # =============================
     # 🌱 BIG SUMMARY METRICS
     # =============================
-    avg_score = history["Eco Score"].mean()
-    total_score = history["Eco Score"].sum()
+    avg_score = stats["mean"]["Eco Score"]
+    total_score = stats["sum"]["Eco Score"]
 
     c1, c2, c3, c4 = st.columns(4)
     c1.metric("Average Eco Score", f"{avg_score:.1f} / 100")
-    c2.metric("Products Logged", len(history))
-    c3.metric("High-Eco Choices", (history["Eco Score"] >= 80).sum())
+    c2.metric("Products Logged", stats["count"])
+    c3.metric("High-Eco Choices", stats["high_eco"])
     c4.metric("Total Eco Score", int(total_score))
 
     st.divider()
@@ -1009,9 +1092,9 @@ elif st.session_state.page == "Impact Dashboard":
     # =============================
     # 🌍 HUMAN IMPACT TRANSLATION
     # =============================
-    avg_carbon = history["Carbon (kg)"].mean()
-    avg_water = history["Water (L)"].mean()
-    avg_energy = history["Energy (MJ)"].mean()
+    avg_carbon = stats["mean"]["Carbon (kg)"]
+    avg_water = stats["mean"]["Water (L)"]
+    avg_energy = stats["mean"]["Energy (MJ)"]
 
     st.markdown("## 🌍 What This Means for the Planet")
 
@@ -1037,22 +1120,50 @@ elif st.session_state.page == "Impact Dashboard":
     # =============================
     st.markdown("## 📈 Your EcoScore Journey")
 
-    trend_fig = px.line(
-        history.reset_index(),
-        x=history.reset_index().index,
-        y="Eco Score",
-        markers=True,
-        color_discrete_sequence=["#22c55e"]
+    # Each purchase (this session's tail), or day / week / month rollups
+    # from the history store: a handful of points whatever the range
+    trend_view = st.radio(
+        "Show", ["Each purchase", *TREND_RANGES], horizontal=True,
+        index=0 if stats["count"] <= 200 else len(TREND_RANGES),
     )
+    if trend_view == "Each purchase":
+        # At most one point per pixel (LTTB keeps the line's peaks and dips);
+        # narrow the range to see every purchase in it
+        first, last = 0, len(history) - 1
+        if len(history) > CHART_WIDTH_PX:
+            first, last = st.slider("Purchases shown", 0, last, (first, last))
+        window = history.iloc[first:last + 1]
+        points = window.iloc[lttb(window.index, window["Eco Score"])]
+        trend_fig = px.line(
+            points,
+            x=points.index,
+            y="Eco Score",
+            markers=True,
+            color_discrete_sequence=["#22c55e"]
+        )
 
-    trend_fig.update_layout(
-        xaxis_title="Order of products analysed",
-        yaxis_title="Eco Score"
-    )
+        trend_fig.update_layout(
+            xaxis_title="Order of products analysed",
+            yaxis_title="Eco Score"
+        )
+    else:
+        resolution, trend = history_store.trend(user, TREND_RANGES[trend_view])
+        trend_fig = px.line(
+            trend,
+            x="Period",
+            y="Avg Eco Score",
+            markers=True,
+            hover_data=["Products", "Carbon (kg)", "Water (L)", "Energy (MJ)"],
+            color_discrete_sequence=["#22c55e"]
+        )
+        trend_fig.update_layout(
+            xaxis_title=f"{resolution.capitalize()} (UTC)",
+            yaxis_title="Average Eco Score"
+        )
 
     st.plotly_chart(trend_fig, use_container_width=True)
-    if len(history) >= 2:
-            delta = history["Eco Score"].iloc[-1] - history["Eco Score"].iloc[0]
+    if stats["delta"] is not None:
+            delta = stats["delta"]
 
             if delta > 5:
                 st.success(f"📈 Your EcoScore improved by **{delta:.1f} points** — your choices are getting greener 🌿")
@@ -1070,11 +1181,11 @@ elif st.session_state.page == "Impact Dashboard":
     # =============================
     st.markdown("## 📊 What Impacts You the Most")
 
-    impact_avg = history[
-        ["Carbon (kg)", "Water (L)", "Energy (MJ)", "Waste Score"]
-    ].mean().reset_index()
-
-    impact_avg.columns = ["Impact Type", "Average Value"]
+    impact_types = ["Carbon (kg)", "Water (L)", "Energy (MJ)", "Waste Score"]
+    impact_avg = pd.DataFrame({
+        "Impact Type": impact_types,
+        "Average Value": [stats["mean"][col] for col in impact_types],
+    })
 
     impact_fig = px.bar(
         impact_avg,
@@ -1101,9 +1212,13 @@ elif st.session_state.page == "Impact Dashboard":
     )
 
     if len(compare_products) >= 2:
-        compare_df = history[history["Product"].isin(compare_products)]
-
         impact_cols = ["Carbon (kg)", "Water (L)", "Energy (MJ)", "Waste Score"]
+        # One bar per product however often it was logged
+        compare_df = (
+            history[history["Product"].isin(compare_products)]
+            .groupby("Product", observed=True, sort=False)[impact_cols].mean()
+            .reset_index()
+        )
         normalized = compare_df.copy()
 
         for col in impact_cols:
@@ -1144,10 +1259,18 @@ elif st.session_state.page == "Impact Dashboard":
     # 📜 HISTORY TABLE
     # =============================
     st.markdown("## 📜 Your Impact Log")
-    st.dataframe(history[::-1], use_container_width=True)
+
+    # Newest first, one page at a time from the history store
+    logged = history_store.count(user)
+    if logged > stats["count"]:
+        st.caption(f"Charts above cover your latest {stats['count']:,} of {logged:,} purchases.")
+    pages = max(1, -(-logged // PAGE_ROWS))
+    page = st.number_input(f"Page (of {pages})", min_value=1, max_value=pages, value=1) if pages > 1 else 1
+    st.dataframe(history_store.page(user, page - 1), hide_index=True, use_container_width=True)
 
     if st.button("🗑️ Clear Impact History"):
-        st.session_state.impact_history = st.session_state.impact_history.iloc[0:0]
+        st.session_state.impact_history.clear()
+        history_store.clear(user)
 
         # 🔑 also reset logging guards
         if "logged_keys" in st.session_state:
@@ -0,0 +1,78 @@
+"""
+Streamlit plumbing shared by the EcoLens apps (app.py, main.py, we.py):
+the scored catalog, the chatbot response cache and each user's purchase
+history. It sits beside the apps rather than in ecolens, so the engine
+holds no Streamlit state.
+"""
+import os
+import uuid
+
+import pandas as pd
+import streamlit as st
+
+from ecolens import HISTORY_FILE, TAIL_ROWS, Catalog, HistoryStore, ImpactLog, ResponseCache
+
+PRODUCT_CSV = "product.csv"
+MATERIAL_CSV = "material.csv"
+
+# Where the apps keep their SQLite files: next to the CSVs, like Catalog.data_dir
+DATA_DIR = os.path.dirname(os.path.abspath(PRODUCT_CSV))
+
+
+@st.cache_resource(max_entries=2, show_spinner="Scoring products...")
+def load_scored_catalog(version, _config):
+    """
+    Read both CSVs and score every product with ecolens.
+    Cached per catalog version (content hash of the CSVs + scoring
+    config, which is why the config itself is left out of the key), so
+    reruns and sessions share one read-only Catalog, and scores and
+    indexes are only rebuilt when an input changes.
+    """
+    return Catalog.load(PRODUCT_CSV, MATERIAL_CSV, _config)
+
+
+@st.cache_resource(show_spinner=False)
+def load_response_cache():
+    """Chatbot answers shared by every session and app (llm-cache.sqlite3 next to the CSVs)."""
+    return ResponseCache(os.path.join(DATA_DIR, "llm-cache.sqlite3"))
+
+
+@st.cache_resource(show_spinner=False, on_release=lambda store: store.close())
+def load_history_store():
+    """Every user's purchase history (impact-history.sqlite3 next to the CSVs), written in batches."""
+    return HistoryStore(os.path.join(DATA_DIR, HISTORY_FILE))
+
+
+def current_user():
+    """
+    Per-browser user id, kept in the page URL (?user=...) so a refresh
+    or a server restart finds the same history.
+    """
+    if "user_id" not in st.session_state:
+        st.session_state.user_id = st.query_params.get("user") or uuid.uuid4().hex
+    if st.query_params.get("user") != st.session_state.user_id:
+        st.query_params["user"] = st.session_state.user_id
+    return st.session_state.user_id
+
+
+def session_history():
+    """
+    This session's ImpactLog, seeded once from the user's stored history
+    (latest TAIL_ROWS purchases; the dashboard pages in older ones).
+    """
+    if "impact_history" not in st.session_state:
+        tail = load_history_store().tail(current_user(), TAIL_ROWS)
+        st.session_state.impact_history = ImpactLog()
+        st.session_state.impact_history.extend(tail)
+        # Products logged on earlier visits count as logged
+        st.session_state.logged_keys = {f"{n}_{s}" for n, s in zip(tail["name"], tail["eco_score"])}
+    return st.session_state.impact_history
+
+
+def log_purchases(rows):
+    """Log a scored catalog row (or DataFrame of rows) in this session and the user's stored history."""
+    if isinstance(rows, pd.DataFrame):
+        session_history().extend(rows)
+    else:
+        session_history().append(rows)
+    load_history_store().add(current_user(), rows)
@@ -0,0 +1,38 @@
+"""EcoLens scoring engine shared by the Streamlit apps."""
+
+from ecolens.alternatives import (
+    GREENER_ALTERNATIVES,
+    AlternativesIndex,
+    get_greener_alternatives,
+    improvement_labels,
+    reduction_percentages,
+)
+from ecolens.alternatives_table import AlternativesTable, materialize_alternatives
+from ecolens.bulk_scan import MIN_LOG_CONFIDENCE, RESULT_COLUMNS, iter_images, iter_uploads, scan_images
+from ecolens.catalog import Catalog, catalog_version, file_fingerprint, file_version
+from ecolens.downsample import CHART_WIDTH_PX, lttb
+from ecolens.explanations import EXPLANATIONS_FILE, ExplanationStore, generate_explanations, product_facts
+from ecolens.extract import AhoCorasick, ProductNameExtractor, clean_ocr_text, extract_product_name
+from ecolens.fuzzy import FuzzyMatcher, edit_distances, fuzzy_match_product
+from ecolens.hf_client import CircuitBreaker, CircuitOpen, HFClient, HFError, ModelLoading
+from ecolens.history_store import HISTORY_FILE, PAGE_ROWS, TAIL_ROWS, TREND_RANGES, HistoryStore, rollup_resolution
+from ecolens.impact import IMPACT_COLUMNS, compute_impact, encode_materials
+from ecolens.impact_log import HIGH_ECO_SCORE, HISTORY_COLUMNS, ImpactLog
+from ecolens.intents import IntentRouter
+from ecolens.llm import LLMClient, stream_text
+from ecolens.lookup import ProductIndex, product_ids
+from ecolens.memory import CHAT_TOKEN_BUDGET, fit_messages
+from ecolens.ocr import OcrPool, OcrQueueFull, image_digest, ocr_image, preprocess
+from ecolens.response_cache import ResponseCache, response_key
+from ecolens.retrieval import RetrievalIndex, catalog_documents
+from ecolens.scan_cache import ScanCache, match_scan, perceptual_hash
+from ecolens.scoring import (
+    DEFAULT_CONFIG,
+    FLAG_COLUMNS,
+    SUMMARY_COLUMNS,
+    ScoringConfig,
+    load_catalog,
+    score_catalog,
+)
+from ecolens.search import ProductSearchIndex, normalize
+from ecolens.tokenizer import count_message_tokens, count_tokens
@@ -0,0 +1,28 @@
+"""
+EcoLens batch jobs.
+
+    python -m ecolens alternatives product.csv material.csv
+    python -m ecolens explain product.csv material.csv
+    python -m ecolens scan photos.zip product.csv material.csv
+"""
+import sys
+
+from ecolens import alternatives_table, bulk_scan, explanations
+
+COMMANDS = {
+    'alternatives': alternatives_table.main,
+    'explain': explanations.main,
+    'scan': bulk_scan.main,
+}
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    if not argv or argv[0] not in COMMANDS:
+        print(__doc__.strip())
+        sys.exit(2)
+    COMMANDS[argv[0]](argv[1:])
+
+
+if __name__ == '__main__':
+    main()
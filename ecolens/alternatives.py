@@ -0,0 +1,174 @@
+import numpy as np
+import pandas as pd
+
+# Curated greener swaps per category (products outside our catalog)
+GREENER_ALTERNATIVES = {
+    "Cream": [
+        {
+            "name": "Minimalist Marula Oil Moisturizer",
+            "reason": "Uses an aluminum tube instead of a plastic jar, reducing total plastic waste."
+        },
+        {
+            "name": "Earth Rhythm Phyto Clear Moisturizer",
+            "reason": "Packaged in a reusable glass jar with lower waste impact than PET."
+        },
+        {
+            "name": "Plum Green Tea Moisturizer",
+            "reason": "Smaller packaging size means less total material used."
+        }
+    ],
+    "Body Wash": [
+        {
+            "name": "Ethique Solid Body Wash Bar",
+            "reason": "Eliminates plastic bottles entirely by using a solid bar format."
+        },
+        {
+            "name": "Earth Rhythm Body Wash Bar",
+            "reason": "Zero plastic packaging results in near-zero packaging emissions."
+        }
+    ],
+    "Sunscreen": [
+        {
+            "name": "Raw Beauty Wellness Sunscreen Stick",
+            "reason": "Paper-based packaging avoids high-energy aluminum and plastic bottles."
+        },
+        {
+            "name": "Dot & Key Sunscreen Stick",
+            "reason": "Compact solid format reduces packaging weight significantly."
+        },
+        {
+            "name": "Minimalist SPF 50 (50g)",
+            "reason": "Smaller tube uses far less material than large sunscreen bottles."
+        }
+    ],
+    "Shampoo": [
+        {
+            "name": "Ethique Shampoo Bar",
+            "reason": "Solid shampoo bar completely removes the need for plastic bottles."
+        },
+        {
+            "name": "Earth Rhythm Shampoo Bar",
+            "reason": "Lower water and carbon footprint due to zero liquid packaging."
+        },
+        {
+            "name": "Bare Anatomy Concentrated Shampoo",
+            "reason": "Concentrated formula requires a smaller bottle."
+        }
+    ]
+}
+
+
+# Metrics compared for the "N% less ..." label, in priority order
+REDUCTION_METRICS = [
+    ('total_carbon_kg', 'carbon'),
+    ('total_water_L', 'water'),
+    ('total_energy_MJ', 'energy'),
+]
+
+
+def reduction_percentages(current, alternatives):
+    """
+    Percent reduction of carbon/water/energy vs the current product.
+    current is (..., 3), alternatives broadcasts against it; a metric
+    the current product doesn't use (<= 0) counts as 0% reduction.
+    """
+    with np.errstate(divide='ignore', invalid='ignore'):
+        pct = (current - alternatives) / current * 100
+    return np.where(current > 0, pct, 0.0)
+
+
+def best_improvement(reductions):
+    """
+    Vectorized pick of the first metric improved by more than 5%.
+    Returns (metric, pct) arrays; metric == len(REDUCTION_METRICS) when
+    nothing improved enough.
+    """
+    improved = reductions > 5
+    metric = np.where(improved.any(axis=-1), improved.argmax(axis=-1), len(REDUCTION_METRICS))
+    clipped = np.minimum(metric, len(REDUCTION_METRICS) - 1)[..., None]
+    pct = np.take_along_axis(reductions, clipped, axis=-1)[..., 0]
+    return metric, pct
+
+
+def format_improvement(metric, pct):
+    if metric >= len(REDUCTION_METRICS):
+        return "Better overall eco score"
+    return f"{pct:.0f}% less {REDUCTION_METRICS[metric][1]}"
+
+
+def improvement_labels(reductions):
+    """First metric improved by more than 5%, as a short label."""
+    return [format_improvement(m, p) for m, p in zip(*best_improvement(reductions))]
+
+
+class AlternativesIndex:
+    """
+    Per-category ranking index over a scored catalog.
+    Rows are grouped by category and sorted by eco_score (best first)
+    in contiguous arrays, so "top-k better than score s in category c"
+    is a binary search plus a slice. Build once per catalog version.
+    """
+
+    def __init__(self, summary_df, row_by_name=None):
+        self.names = summary_df['name'].to_numpy(dtype=object)
+        self.scores = summary_df['eco_score'].to_numpy(dtype=np.float64)
+        self.metrics = summary_df[[col for col, _ in REDUCTION_METRICS]].to_numpy(dtype=np.float64)
+        self.codes, self.categories = pd.factorize(summary_df['category'])
+
+        # Category, then best score first; lexsort is stable so ties keep catalog order
+        order = np.lexsort((-self.scores, self.codes))
+        order = order[self.codes[order] >= 0]  # rows without a category never match
+        self.order = order
+        self.neg_scores = -self.scores[order]
+        self.bounds = np.searchsorted(self.codes[order], np.arange(len(self.categories) + 1))
+
+        # First row wins, like summary_df[summary_df['name'] == name].iloc[0]
+        if row_by_name is None:
+            row_by_name = {name: i for i, name in reversed(list(enumerate(self.names)))}
+        self.row_by_name = row_by_name
+        self.has_duplicate_names = len(row_by_name) < len(self.names)
+
+    def better_rows(self, row, max_alternatives=5):
+        """Row positions of the top-k products in row's category scoring higher."""
+        code, score = self.codes[row], self.scores[row]
+        if code < 0 or np.isnan(score):
+            return self.order[:0]
+
+        lo, hi = self.bounds[code], self.bounds[code + 1]
+        n_better = np.searchsorted(self.neg_scores[lo:hi], -score, side='left')
+        candidates = self.order[lo:lo + n_better]
+
+        if self.has_duplicate_names:
+            candidates = candidates[self.names[candidates] != self.names[row]]
+        return candidates[:max_alternatives]
+
+    def greener_alternatives(self, current_product_name, max_alternatives=5):
+        """Same result as get_greener_alternatives, without scanning the catalog."""
+        row = self.row_by_name.get(current_product_name)
+        if row is None:
+            return []
+
+        picked = self.better_rows(row, max_alternatives)
+        labels = improvement_labels(reduction_percentages(self.metrics[row], self.metrics[picked]))
+        current_score = self.scores[row]
+
+        return [
+            {
+                'name': self.names[alt],
+                'eco_score': self.scores[alt],
+                'improvement': label,  # Show the best improvement
+                'score_diff': self.scores[alt] - current_score
+            }
+            for alt, label in zip(picked, labels)
+        ]
+
+
+def get_greener_alternatives(current_product_name, summary_df, max_alternatives=5):
+    """
+    Find greener alternatives from the actual product database.
+    Returns products in the same category with better eco scores.
+    Builds a throwaway index; pages should keep an AlternativesIndex
+    (Catalog.alternatives) and call greener_alternatives on it.
+    """
+    index = AlternativesIndex(summary_df)
+    return index.greener_alternatives(current_product_name, max_alternatives)
@@ -0,0 +1,265 @@
+"""
+Batch job: materialize the top-N greener alternatives of every product.
+
+    python -m ecolens alternatives product.csv material.csv
+
+writes alternatives-<catalog version>.npz next to product.csv. Pages and
+APIs then serve alternatives from the table (Catalog.alternatives_table)
+instead of ranking per request.
+"""
+import argparse
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from ecolens.alternatives import (
+    REDUCTION_METRICS,
+    AlternativesIndex,
+    best_improvement,
+    format_improvement,
+    reduction_percentages,
+)
+
+TABLE_COLUMNS = [
+    'product_row',
+    'product',
+    'rank',
+    'alternative_row',
+    'alternative',
+    'score_diff',
+    'improvement',
+]
+
+# Below this many products a process pool costs more than it saves
+PARALLEL_MIN_ROWS = 200_000
+
+
+def _materialize_block(rows, name_codes, scores, metrics, max_alternatives):
+    """
+    Top-N alternatives for every product of one category.
+    Arrays hold the category's rows sorted best first (AlternativesIndex
+    order), so each product's alternatives are a prefix of the block:
+    the first min(N, number strictly better) rows, minus same-name rows.
+    name_codes is None when every product has its own, non-blank name.
+    """
+    n = len(rows)
+    n_better = np.searchsorted(-scores, -scores, side='left')
+
+    # Products sharing a name exclude each other, so look a bit further
+    extra = 0
+    if name_codes is not None:
+        known = name_codes[name_codes >= 0]
+        extra = int(np.bincount(known).max()) - 1 if len(known) else 0
+
+    k = min(n, max_alternatives + extra)
+    valid = np.arange(k)[None, :] < n_better[:, None]
+    if name_codes is not None:
+        valid &= name_codes[None, :k] != name_codes[:, None]
+        valid &= (name_codes >= 0)[:, None]  # unnamed products can't be looked up
+
+    # Shift valid candidates left (keeping rank order) and keep the first N
+    pick = np.argsort(~valid, axis=1, kind='stable')[:, :max_alternatives]
+    product_pos, rank = np.nonzero(np.take_along_axis(valid, pick, axis=1))
+    alt_pos = pick[product_pos, rank]
+
+    reductions = reduction_percentages(metrics[product_pos], metrics[alt_pos])
+    metric, pct = best_improvement(reductions)
+
+    return pd.DataFrame({
+        'product_row': rows[product_pos].astype(np.int32),
+        'rank': rank.astype(np.int8),
+        'alternative_row': rows[alt_pos].astype(np.int32),
+        'score_diff': (scores[alt_pos] - scores[product_pos]).astype(np.float32),
+        'metric': metric.astype(np.int8),
+        'pct': pct,
+    })
+
+
+def _materialize_partition(blocks, max_alternatives):
+    return [_materialize_block(*block, max_alternatives) for block in blocks]
+
+
+def _partition(blocks, parts):
+    # Greedy largest-first so partitions get similar row counts
+    bins = [[] for _ in range(parts)]
+    sizes = [0] * parts
+    for block in sorted(blocks, key=lambda b: len(b[0]), reverse=True):
+        i = sizes.index(min(sizes))
+        bins[i].append(block)
+        sizes[i] += len(block[0])
+    return [b for b in bins if b]
+
+
+def _name_column(names, rows):
+    # Categorical over the distinct rows only (names may repeat)
+    unique_rows, inverse = np.unique(rows, return_inverse=True)
+    codes, categories = pd.factorize(names[unique_rows])
+    return pd.Categorical.from_codes(codes[inverse.reshape(-1)], categories=categories)
+
+
+def _labels(metric, pct):
+    # Few distinct (metric, rounded pct) pairs: format each one once
+    rounded = np.rint(np.where(metric < len(REDUCTION_METRICS), pct, 0)).astype(np.int64)
+    keys, inverse = np.unique(metric.astype(np.int64) * 1000 + rounded, return_inverse=True)
+    labels = [format_improvement(key // 1000, key % 1000) for key in keys]
+    return pd.Categorical.from_codes(inverse.reshape(-1), categories=labels)
+
+
+def materialize_alternatives(summary_df, max_alternatives=5, workers=None, index=None):
+    """
+    Top-N greener alternatives for every product in one vectorized pass.
+    Returns a compact long table (one row per product/alternative pair,
+    sorted by product row then rank). Work is partitioned by category
+    across `workers` processes for large catalogs.
+    """
+    index = index or AlternativesIndex(summary_df)
+
+    name_codes = None
+    if index.has_duplicate_names or pd.isna(index.names).any():
+        name_codes, _ = pd.factorize(index.names)
+
+    blocks = []
+    for code in range(len(index.categories)):
+        rows = index.order[index.bounds[code]:index.bounds[code + 1]]
+        if len(rows):
+            block_names = None if name_codes is None else name_codes[rows]
+            blocks.append((rows, block_names, index.scores[rows], index.metrics[rows]))
+
+    if workers is None:
+        workers = os.cpu_count() if len(summary_df) >= PARALLEL_MIN_ROWS else 1
+
+    if workers > 1 and len(blocks) > 1:
+        partitions = _partition(blocks, min(workers, len(blocks)))
+        # spawn, not fork: this can run inside a threaded server (Catalog.alternatives_table)
+        with ProcessPoolExecutor(max_workers=len(partitions),
+                                 mp_context=multiprocessing.get_context('spawn')) as pool:
+            parts = [
+                df
+                for result in pool.map(_materialize_partition, partitions, [max_alternatives] * len(partitions))
+                for df in result
+            ]
+    else:
+        parts = _materialize_partition(blocks, max_alternatives)
+
+    if not parts:
+        return pd.DataFrame(columns=TABLE_COLUMNS)
+
+    table = pd.concat(parts, ignore_index=True)
+    key = table['product_row'].to_numpy(dtype=np.int64) * 256 + table['rank'].to_numpy()
+    table = table.take(np.argsort(key, kind='stable')).reset_index(drop=True)
+
+    table['product'] = _name_column(index.names, table['product_row'].to_numpy())
+    table['alternative'] = _name_column(index.names, table['alternative_row'].to_numpy())
+    table['improvement'] = _labels(table.pop('metric').to_numpy(), table.pop('pct').to_numpy())
+
+    return table[TABLE_COLUMNS]
+
+
+class AlternativesTable:
+    """
+    Read side of the materialized table: per-product slices by row.
+    for_product() returns the same dicts as get_greener_alternatives.
+    """
+
+    def __init__(self, table, index, max_alternatives):
+        self.table = table
+        self.index = index
+        self.max_alternatives = max_alternatives
+        product_rows = table['product_row'].to_numpy()
+        self.starts = np.searchsorted(product_rows, np.arange(len(index.names) + 1))
+
+    @classmethod
+    def build(cls, summary_df, max_alternatives=5, workers=None, index=None):
+        index = index or AlternativesIndex(summary_df)
+        table = materialize_alternatives(summary_df, max_alternatives, workers, index)
+        return cls(table, index, max_alternatives)
+
+    @classmethod
+    def load(cls, path, summary_df, index=None):
+        """Table written by save(); names come from summary_df (the same catalog version)."""
+        index = index or AlternativesIndex(summary_df)
+        with np.load(path, allow_pickle=False) as data:
+            product_rows, alternative_rows = data['product_row'], data['alternative_row']
+            table = pd.DataFrame({
+                'product_row': product_rows,
+                'product': _name_column(index.names, product_rows),
+                'rank': data['rank'],
+                'alternative_row': alternative_rows,
+                'alternative': _name_column(index.names, alternative_rows),
+                'score_diff': data['score_diff'],
+                'improvement': pd.Categorical.from_codes(data['improvement_codes'],
+                                                         categories=data['improvement_labels'].tolist()),
+            })
+        max_alternatives = int(table['rank'].max()) + 1 if len(table) else 0
+        return cls(table, index, max_alternatives)
+
+    def save(self, path):
+        """Plain arrays in an .npz (no pickles); names are rebuilt from the catalog on load."""
+        improvement = self.table['improvement'].astype('category').cat
+        with open(path, 'wb') as f:
+            np.savez(
+                f,
+                product_row=self.table['product_row'].to_numpy(dtype=np.int32),
+                rank=self.table['rank'].to_numpy(dtype=np.int8),
+                alternative_row=self.table['alternative_row'].to_numpy(dtype=np.int32),
+                score_diff=self.table['score_diff'].to_numpy(dtype=np.float32),
+                improvement_codes=improvement.codes.to_numpy(),
+                improvement_labels=np.array(improvement.categories, dtype=str),
+            )
+
+    def for_product(self, current_product_name, max_alternatives=5):
+        row = self.index.row_by_name.get(current_product_name)
+        if row is None:
+            return []
+        if max_alternatives > self.max_alternatives:
+            # Deeper than what was materialized: rank live
+            return self.index.greener_alternatives(current_product_name, max_alternatives)
+
+        part = self.table.iloc[self.starts[row]:self.starts[row + 1]].head(max_alternatives)
+        scores = self.index.scores
+        return [
+            {
+                'name': alt,
+                'eco_score': scores[alt_row],
+                'improvement': improvement,
+                'score_diff': float(diff),
+            }
+            for alt, alt_row, improvement, diff in zip(
+                part['alternative'], part['alternative_row'], part['improvement'], part['score_diff']
+            )
+        ]
+
+
+def table_path(data_dir, version):
+    """Where the batch job stores the table for a catalog version."""
+    return os.path.join(data_dir, f"alternatives-{version}.npz")
+
+
+def main(argv=None):
+    from ecolens.catalog import catalog_version
+    from ecolens.scoring import ScoringConfig, load_catalog
+
+    parser = argparse.ArgumentParser(prog='python -m ecolens alternatives',
+                                     description=__doc__.strip().splitlines()[0])
+    parser.add_argument('products', help="product.csv")
+    parser.add_argument('materials', help="material.csv")
+    parser.add_argument('-n', '--max-alternatives', type=int, default=5)
+    parser.add_argument('-j', '--workers', type=int, default=None, help="processes (default: all cores)")
+    parser.add_argument('--shares', type=float, nargs=3, metavar=('PACKAGING', 'INGREDIENT', 'BONUS'),
+                        default=(1.0, 0.0, 0.0), help="EcoScore breakup (we.py uses 0.5 0.4 0.1)")
+    parser.add_argument('-o', '--output', help="default: alternatives-<version>.npz next to products")
+    args = parser.parse_args(argv)
+
+    packaging, ingredient, bonus = args.shares
+    config = ScoringConfig(packaging_share=packaging, ingredient_share=ingredient, bonus_share=bonus)
+    summary_df = load_catalog(args.products, args.materials, config)
+    version = catalog_version(args.products, args.materials, config)
+
+    table = AlternativesTable.build(summary_df, args.max_alternatives, args.workers or os.cpu_count())
+    output = args.output or table_path(os.path.dirname(os.path.abspath(args.products)), version)
+    table.save(output)
+    print(f"{len(table.table)} alternatives for {len(summary_df)} products -> {output}")
+
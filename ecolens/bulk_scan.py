@@ -0,0 +1,140 @@
+"""
+Bulk scanning: OCR and match a folder or zip of product photos.
+
+    python -m ecolens scan photos.zip product.csv material.csv -o matches.csv
+
+Photos are read in parallel on a process pool; matching runs in the
+calling process against the shared indexes. Results stream back as
+photos finish, so pages can fill a table while the rest is read.
+"""
+import argparse
+import io
+import multiprocessing
+import os
+import zipfile
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+import pandas as pd
+
+from ecolens.ocr import ocr_bytes, ocr_image
+from ecolens.scan_cache import match_scan
+
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.webp', '.bmp', '.tif', '.tiff')
+
+RESULT_COLUMNS = ['file', 'matched_name', 'confidence', 'detected_name', 'error']
+
+# Matches below this confidence are not logged as purchases unless the user ticks them
+MIN_LOG_CONFIDENCE = 0.6
+
+
+def _is_image(name):
+    base = os.path.basename(name)
+    return name.lower().endswith(IMAGE_EXTENSIONS) and not base.startswith('.')
+
+
+def iter_images(source):
+    """
+    (file name, image bytes) for every photo in a directory (recursively),
+    a zip file (path or file object) or a single image file.
+    """
+    if isinstance(source, (str, os.PathLike)) and os.path.isdir(source):
+        for root, _, files in sorted(os.walk(source)):
+            for name in sorted(files):
+                if _is_image(name):
+                    path = os.path.join(root, name)
+                    with open(path, 'rb') as f:
+                        yield os.path.relpath(path, source), f.read()
+    elif zipfile.is_zipfile(source):
+        with zipfile.ZipFile(source) as archive:
+            for info in archive.infolist():
+                if not info.is_dir() and _is_image(info.filename):
+                    yield info.filename, archive.read(info)
+    else:
+        with open(source, 'rb') as f:
+            yield os.path.basename(source), f.read()
+
+
+def iter_uploads(files):
+    """iter_images over Streamlit uploads: photos as-is, zips expanded."""
+    for upload in files:
+        if upload.name.lower().endswith('.zip'):
+            yield from iter_images(io.BytesIO(upload.getvalue()))
+        elif _is_image(upload.name):
+            yield upload.name, upload.getvalue()
+
+
+def scan_images(images, extractor, matcher, workers=None, cache=None, engine=ocr_image):
+    """
+    Yield one result dict (RESULT_COLUMNS) per photo, in completion order.
+    At most 2 x workers photos are in flight, so a large folder never
+    sits in memory at once. Photos found in `cache` (a ScanCache) skip
+    OCR; fresh results are added to it.
+    """
+    workers = workers or os.cpu_count() or 1
+    images = iter(images)
+    in_flight = {}
+
+    def row(name, scan, error=None):
+        return {
+            'file': name,
+            'matched_name': scan.get('matched_name'),
+            'confidence': scan.get('confidence', 0.0),
+            'detected_name': scan.get('detected_name'),
+            'error': error,
+        }
+
+    with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn')) as pool:
+        while True:
+            # Top up the pool; cached photos are answered right away
+            for name, image_bytes in images:
+                cached = cache.get(image_bytes) if cache is not None else None
+                if cached is not None:
+                    yield row(name, cached)
+                    continue
+                in_flight[pool.submit(ocr_bytes, engine, image_bytes)] = (name, image_bytes)
+                if len(in_flight) >= 2 * workers:
+                    break
+
+            if not in_flight:
+                return
+
+            done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+            for future in done:
+                name, image_bytes = in_flight.pop(future)
+                try:
+                    text = future.result()
+                except Exception as e:
+                    yield row(name, {}, error=str(e))
+                    continue
+                scan = match_scan(text, extractor, matcher)
+                if cache is not None:
+                    cache.put(image_bytes, scan)
+                yield row(name, scan)
+
+
+def main(argv=None):
+    from ecolens.catalog import Catalog
+    from ecolens.extract import ProductNameExtractor
+
+    parser = argparse.ArgumentParser(prog='python -m ecolens scan',
+                                     description=__doc__.strip().splitlines()[0])
+    parser.add_argument('photos', help="folder, zip file or image")
+    parser.add_argument('products', help="product.csv")
+    parser.add_argument('materials', help="material.csv")
+    parser.add_argument('-j', '--workers', type=int, default=None, help="processes (default: all cores)")
+    parser.add_argument('-o', '--output', help="also write the matches to this CSV")
+    args = parser.parse_args(argv)
+
+    catalog = Catalog.load(args.products, args.materials)
+    extractor = ProductNameExtractor(pd.read_csv(args.products))
+
+    rows = []
+    for result in scan_images(iter_images(args.photos), extractor, catalog.fuzzy, args.workers):
+        rows.append(result)
+        print(f"{result['file']}: {result['matched_name'] or result['error'] or '-'} ({result['confidence']:.0%})")
+
+    results = pd.DataFrame(rows, columns=RESULT_COLUMNS).sort_values('file', ignore_index=True)
+    if args.output:
+        results.to_csv(args.output, index=False)
+    matched = results['matched_name'].notna().sum()
+    print(f"{matched} of {len(results)} photos matched")
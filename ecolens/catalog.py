@@ -0,0 +1,130 @@
+import hashlib
+import json
+import os
+import threading
+from functools import lru_cache
+
+import pandas as pd
+
+from ecolens.alternatives import AlternativesIndex
+from ecolens.alternatives_table import AlternativesTable, table_path
+from ecolens.fuzzy import FuzzyMatcher
+from ecolens.intents import IntentRouter
+from ecolens.lookup import ProductIndex
+from ecolens.retrieval import RetrievalIndex, catalog_documents
+from ecolens.scoring import DEFAULT_CONFIG, score_catalog
+from ecolens.search import ProductSearchIndex
+
+
+def file_fingerprint(path):
+    """
+    Cheap identity for a file: (absolute path, mtime, size).
+    A stat() per rerun instead of re-reading the file.
+    """
+    stat = os.stat(path)
+    return (os.path.abspath(path), stat.st_mtime_ns, stat.st_size)
+
+
+@lru_cache(maxsize=32)
+def _file_digest(fingerprint):
+    # Only re-hashed when mtime/size change (the fingerprint is the cache key)
+    digest = hashlib.sha256()
+    with open(fingerprint[0], 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def file_version(path):
+    """Content hash of one file (16 hex), re-read only when it changes."""
+    return _file_digest(file_fingerprint(path))[:16]
+
+
+def catalog_version(product_csv, material_csv, config):
+    """
+    Version id of a scored catalog: content hash of both CSVs plus the
+    ScoringConfig (caps, weights). Changes only when an input does.
+    """
+    digest = hashlib.sha256()
+    for path in (product_csv, material_csv):
+        digest.update(_file_digest(file_fingerprint(path)).encode())
+    digest.update(json.dumps(config.as_dict(), sort_keys=True).encode())
+    return digest.hexdigest()[:16]
+
+
+class Catalog:
+    """
+    One immutable scored-catalog snapshot plus the indexes built on it.
+    Indexes are built lazily, once per catalog version, and shared by
+    every session holding this object.
+    """
+
+    def __init__(self, summary_df, version, data_dir=None, materials_df=None):
+        self.summary_df = summary_df
+        self.version = version
+        self.data_dir = data_dir  # where batch-job outputs for this catalog live
+        self.materials_df = materials_df
+        self._indexes = {}
+        self._lock = threading.RLock()
+
+    @classmethod
+    def load(cls, product_csv, material_csv, config=DEFAULT_CONFIG):
+        version = catalog_version(product_csv, material_csv, config)
+        data_dir = os.path.dirname(os.path.abspath(product_csv))
+        materials_df = pd.read_csv(material_csv)
+        summary_df = score_catalog(pd.read_csv(product_csv), materials_df, config)
+        return cls(summary_df, version, data_dir, materials_df)
+
+    def _index(self, key, build):
+        with self._lock:
+            if key not in self._indexes:
+                self._indexes[key] = build(self.summary_df)
+            return self._indexes[key]
+
+    @property
+    def products(self):
+        """ProductIndex: O(1) name / product_id -> row and option lookups."""
+        return self._index('products', ProductIndex)
+
+    @property
+    def search(self):
+        """ProductSearchIndex: prefix / trigram search over names and brands."""
+        return self._index('search', ProductSearchIndex)
+
+    @property
+    def fuzzy(self):
+        """FuzzyMatcher: (name, confidence) matches for OCR'd names."""
+        return self._index('fuzzy', lambda df: FuzzyMatcher(df, self.search))
+
+    @property
+    def retrieval(self):
+        """RetrievalIndex: BM25 over product, category, material and alternative records."""
+        return self._index('retrieval', lambda df: RetrievalIndex(catalog_documents(df, self.materials_df)))
+
+    @property
+    def intents(self):
+        """IntentRouter: catalog answers to lookup questions, no model call."""
+        return self._index(
+            'intents', lambda df: IntentRouter(df, self.products, self.fuzzy, self.alternatives_table)
+        )
+
+    @property
+    def alternatives(self):
+        """AlternativesIndex: per-category eco_score ranking."""
+        return self._index('alternatives', lambda df: AlternativesIndex(df, self.products.row_by_name))
+
+    @property
+    def alternatives_table(self):
+        """
+        AlternativesTable: top-5 alternatives of every product. Read from
+        the batch job's output for this version if present, else built.
+        """
+        return self._index('alternatives_table', self._load_alternatives_table)
+
+    def _load_alternatives_table(self, summary_df):
+        index = self.alternatives
+        if self.data_dir:
+            path = table_path(self.data_dir, self.version)
+            if os.path.exists(path):
+                return AlternativesTable.load(path, summary_df, index)
+        return AlternativesTable.build(summary_df, index=index)
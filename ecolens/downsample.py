@@ -0,0 +1,47 @@
+"""
+Largest-Triangle-Three-Buckets (LTTB) downsampling for line charts.
+
+A line with more points than the chart has pixels looks the same with
+far fewer: LTTB splits the series into equal buckets and keeps, from
+each, the point that forms the largest triangle with the point kept
+before it and the average of the next bucket, so peaks and dips
+survive. The dashboard sends at most CHART_WIDTH_PX points per chart.
+"""
+import numpy as np
+
+# Width of a full-width chart in the apps' wide layout on a desktop screen; one point per pixel
+CHART_WIDTH_PX = 1200
+
+
+def lttb(x, y, n=CHART_WIDTH_PX):
+    """
+    Positions of the n points of (x, y) that LTTB keeps, in order, first
+    and last included. Every position when there are n or fewer points;
+    never more than n.
+    """
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    size = len(x)
+    if size <= n:
+        return np.arange(size)
+    if n < 3:
+        # No buckets between the ends: keep the first and/or last point
+        return np.array([0, size - 1][:max(n, 0)], dtype=np.int64)
+
+    # n - 2 buckets between the first and last point; the final bucket's "next" is the last point
+    edges = np.append(np.linspace(1, size - 1, n - 1).astype(np.int64), size)
+    cx = np.concatenate(([0.0], np.cumsum(x)))
+    cy = np.concatenate(([0.0], np.cumsum(y)))
+
+    keep = np.empty(n, dtype=np.int64)
+    keep[0], keep[-1] = 0, size - 1
+    a = 0
+    for i in range(n - 2):
+        start, stop, after = edges[i], edges[i + 1], edges[i + 2]
+        avg_x = (cx[after] - cx[stop]) / (after - stop)
+        avg_y = (cy[after] - cy[stop]) / (after - stop)
+        bx, by = x[start:stop], y[start:stop]
+        area = np.abs((x[a] - avg_x) * (by - y[a]) - (x[a] - bx) * (avg_y - y[a]))
+        a = start + int(np.argmax(area))
+        keep[i + 1] = a
+    return keep
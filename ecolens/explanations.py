@@ -0,0 +1,217 @@
+"""
+Batch job: pre-generate the standard AI explanation of every product.
+
+    OPENAI_API_KEY=... python -m ecolens explain product.csv material.csv
+
+writes explanations into explanations.sqlite3 next to product.csv,
+keyed by catalog version and product_id. The GreenScore page shows a
+stored explanation at once and only calls the model for follow-up
+questions. Re-running resumes: products already explained for this
+version are skipped, so an interrupted or partly failed run is simply
+started again. --base-url points the job at any OpenAI-compatible
+server (a local mock, for testing).
+"""
+import argparse
+import itertools
+import os
+import sqlite3
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+EXPLANATIONS_FILE = 'explanations.sqlite3'
+
+EXPLANATION_MODEL = 'gpt-4o-mini'
+
+EXPLANATION_PROMPT = (
+    "You are a product-focused sustainability assistant. In 3 to 4 short sentences, "
+    "explain to a shopper why this product gets its eco score: name the impacts and "
+    "ingredients that help or hurt it most, and what to look for in a greener option. "
+    "Only use the data given; do not invent numbers."
+)
+
+
+def product_facts(r):
+    """The PRODUCT CONTEXT block the product chat and the explanations share."""
+    return (
+        f"Name: {r['name']}\n"
+        f"Category: {r['category']}\n"
+        f"Eco Score: {r['eco_score']} / 100\n"
+        f"Carbon: {r['total_carbon_kg']} kg CO₂e\n"
+        f"Water: {r['total_water_L']} L\n"
+        f"Energy: {r['total_energy_MJ']} MJ\n"
+        f"Waste Score: {r['total_waste_score']}\n"
+        f"Microplastics: {bool(int(r['microplastics']))}\n"
+        f"Silicones: {bool(int(r['silicones']))}\n"
+        f"Petroleum-derived: {bool(int(r['petroleum']))}"
+    )
+
+
+def explanation_messages(r):
+    return [
+        {'role': 'system', 'content': EXPLANATION_PROMPT},
+        {'role': 'user', 'content': f"PRODUCT CONTEXT:\n{product_facts(r)}"},
+    ]
+
+
+class ExplanationStore:
+    """
+    Explanations by (catalog version, product_id) in SQLite (WAL, so the
+    apps read while a job writes). Versions are kept side by side: each
+    app scores with its own config and so has its own version.
+    """
+
+    def __init__(self, path, version):
+        self.version = version
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False, timeout=10)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        with self._db:
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS explanations (version TEXT, product_id TEXT, "
+                "explanation TEXT, model TEXT, tokens INTEGER, created REAL, "
+                "PRIMARY KEY (version, product_id))"
+            )
+
+    def get(self, product_id):
+        """Stored explanation of a product, or None."""
+        with self._lock:
+            row = self._db.execute(
+                "SELECT explanation FROM explanations WHERE version = ? AND product_id = ?",
+                (self.version, str(product_id)),
+            ).fetchone()
+        return row[0] if row else None
+
+    def done_ids(self):
+        """product_ids (as strings) already explained for this version."""
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT product_id FROM explanations WHERE version = ?", (self.version,)
+            ).fetchall()
+        return {row[0] for row in rows}
+
+    def put(self, product_id, explanation, model, tokens=None):
+        with self._lock, self._db:
+            self._db.execute(
+                "INSERT OR REPLACE INTO explanations VALUES (?, ?, ?, ?, ?, ?)",
+                (self.version, str(product_id), explanation, model, tokens, time.time()),
+            )
+
+    def __len__(self):
+        with self._lock:
+            return self._db.execute(
+                "SELECT COUNT(*) FROM explanations WHERE version = ?", (self.version,)
+            ).fetchone()[0]
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+
+class RateLimiter:
+    """At most `rate` acquisitions per second across threads, evenly spaced."""
+
+    def __init__(self, rate, clock=time.monotonic, sleep=time.sleep):
+        self.interval = 1.0 / rate if rate else 0.0
+        self.clock = clock
+        self.sleep = sleep
+        self._next = 0.0
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        with self._lock:
+            now = self.clock()
+            slot = max(now, self._next)
+            self._next = slot + self.interval
+        if slot > now:
+            self.sleep(slot - now)
+
+
+def _explain(client, model, r, limiter):
+    limiter.acquire()
+    response = client.chat.completions.create(
+        model=model,
+        messages=explanation_messages(r),
+        temperature=0.3,
+    )
+    tokens = response.usage.total_tokens if response.usage else None
+    return response.choices[0].message.content.strip(), tokens
+
+
+def generate_explanations(summary_df, store, client, model=EXPLANATION_MODEL, concurrency=4,
+                          rate=None, limit=None):
+    """
+    Explain every product of summary_df not yet in store, with at most
+    `concurrency` requests in flight and `rate` requests per second.
+    Each explanation is stored as soon as it arrives. Failed products
+    are reported and left out, for the next run to pick up.
+    Yields (product name, error or None) per finished product.
+    """
+    done = store.done_ids()
+    todo = itertools.islice((r for _, r in summary_df.iterrows() if str(r['product_id']) not in done), limit)
+    limiter = RateLimiter(rate)
+    in_flight = {}
+
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        while True:
+            for r in todo:
+                in_flight[pool.submit(_explain, client, model, r, limiter)] = r
+                if len(in_flight) >= 2 * concurrency:
+                    break
+
+            if not in_flight:
+                return
+
+            finished, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+            for future in finished:
+                r = in_flight.pop(future)
+                try:
+                    explanation, tokens = future.result()
+                except Exception as e:
+                    yield r['name'], str(e) or type(e).__name__
+                    continue
+                store.put(r['product_id'], explanation, model, tokens)
+                yield r['name'], None
+
+
+def main(argv=None):
+    from ecolens.catalog import catalog_version
+    from ecolens.llm import LLMClient
+    from ecolens.scoring import ScoringConfig, load_catalog
+
+    parser = argparse.ArgumentParser(prog='python -m ecolens explain',
+                                     description=__doc__.strip().splitlines()[0])
+    parser.add_argument('products', help="product.csv")
+    parser.add_argument('materials', help="material.csv")
+    parser.add_argument('--shares', nargs=3, type=float, metavar=('PACKAGING', 'INGREDIENT', 'BONUS'),
+                        default=(1.0, 0.0, 0.0), help="EcoScore breakup (we.py uses 0.5 0.4 0.1)")
+    parser.add_argument('--model', default=EXPLANATION_MODEL)
+    parser.add_argument('-j', '--concurrency', type=int, default=4, help="requests in flight (default: 4)")
+    parser.add_argument('--rate', type=float, default=5.0, help="requests per second (default: 5, 0: unlimited)")
+    parser.add_argument('--limit', type=int, default=None, help="explain at most this many products")
+    parser.add_argument('--base-url', default=None, help="OpenAI-compatible endpoint (default: OPENAI_BASE_URL)")
+    parser.add_argument('-o', '--output', help=f"default: {EXPLANATIONS_FILE} next to products")
+    args = parser.parse_args(argv)
+
+    packaging, ingredient, bonus = args.shares
+    config = ScoringConfig(packaging_share=packaging, ingredient_share=ingredient, bonus_share=bonus)
+    summary_df = load_catalog(args.products, args.materials, config)
+    version = catalog_version(args.products, args.materials, config)
+
+    output = args.output or os.path.join(os.path.dirname(os.path.abspath(args.products)), EXPLANATIONS_FILE)
+    store = ExplanationStore(output, version)
+    llm = LLMClient(os.environ.get('OPENAI_API_KEY'), max_concurrency=args.concurrency, base_url=args.base_url)
+
+    failed = 0
+    for name, error in generate_explanations(summary_df, store, llm.client, args.model,
+                                             args.concurrency, args.rate, args.limit):
+        failed += error is not None
+        print(f"{name}: {'failed: ' + error if error else 'ok'}")
+
+    print(f"{len(store)} of {len(summary_df)} products explained for version {version} -> {output}")
+    llm.close()
+    store.close()
+    if failed:
+        print(f"{failed} failed; run again to retry them")
+        raise SystemExit(1)
@@ -0,0 +1,179 @@
+import re
+from collections import deque
+
+import numpy as np
+
+from ecolens.search import normalize, product_brands
+
+# "600 ml" / "80 G" on a label -> "600ml" / "80g", as in catalog names
+_SIZE = re.compile(r"\b(\d+(?:\s\d+)?)\s?(ml|l|g|kg|oz)\b")
+_SIZE_TOKEN = re.compile(r"^\d+(ml|l|g|kg|oz)$")
+
+# How much one vocabulary hit says about which product is on the label
+TERM_WEIGHTS = {
+    'brand': 3.0,
+    'category': 2.0,
+    'size': 2.0,
+    'line': 1.0,  # any other word of the product name
+}
+
+# A name is only trusted when the label shows one of its brand or name
+# words and at least this share of its total term weight; categories and
+# sizes alone ("recyclable bottle 300ml") say nothing about the product
+MIN_NAME_EVIDENCE = 0.4
+
+
+def clean_ocr_text(text):
+    """Normalized OCR text with sizes glued to their units."""
+    return _SIZE.sub(lambda m: m.group(1).replace(' ', '') + m.group(2), normalize(text))
+
+
+class AhoCorasick:
+    """
+    Multi-pattern matcher: every pattern is found in one pass over the
+    text, whatever the number of patterns. Patterns are matched on word
+    boundaries (text and patterns are space-padded).
+    """
+
+    def __init__(self, patterns):
+        self.goto = [{}]
+        self.fail = [0]
+        self.out = [[]]  # pattern ids ending at each state
+
+        for pid, pattern in enumerate(patterns):
+            state = 0
+            for ch in f" {pattern} ":
+                nxt = self.goto[state].get(ch)
+                if nxt is None:
+                    nxt = len(self.goto)
+                    self.goto[state][ch] = nxt
+                    self.goto.append({})
+                    self.fail.append(0)
+                    self.out.append([])
+                state = nxt
+            self.out[state].append(pid)
+
+        # Breadth-first failure links; outputs inherit their fail state's
+        queue = deque(self.goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for ch, nxt in self.goto[state].items():
+                queue.append(nxt)
+                f = self.fail[state]
+                while f and ch not in self.goto[f]:
+                    f = self.fail[f]
+                self.fail[nxt] = self.goto[f].get(ch, 0)
+                self.out[nxt] = self.out[nxt] + self.out[self.fail[nxt]]
+
+    def find(self, text):
+        """Set of pattern ids occurring in text."""
+        goto, fail, out = self.goto, self.fail, self.out
+        found = set()
+        state = 0
+        for ch in f" {text} ":
+            while state and ch not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(ch, 0)
+            if out[state]:
+                found.update(out[state])
+        return found
+
+
+class ProductNameExtractor:
+    """
+    Finds catalog vocabulary (brands, product-line words, categories,
+    sizes) in raw OCR text and ranks catalog names by the weighted terms
+    they share with it. Depends only on product.csv, so build it once
+    per product.csv version.
+    """
+
+    def __init__(self, products_df):
+        self.names = products_df['name'].to_numpy(dtype=object)
+
+        weight_of, rows_of, named_rows_of = {}, {}, {}
+
+        def add(term, kind, row):
+            if term:
+                weight_of[term] = max(weight_of.get(term, 0.0), TERM_WEIGHTS[kind])
+                rows_of.setdefault(term, set()).add(row)
+                if kind in ('brand', 'line'):
+                    named_rows_of.setdefault(term, set()).add(row)
+
+        brands = product_brands(products_df)
+        for row, (name, category, brand) in enumerate(zip(self.names, products_df['category'], brands)):
+            brand = normalize(brand)
+            add(brand, 'brand', row)
+            add(normalize(category), 'category', row)
+            for token in normalize(name).split():
+                if token not in brand.split():
+                    add(token, 'size' if _SIZE_TOKEN.match(token) else 'line', row)
+
+        self.terms = list(weight_of)
+        self.weights = np.array([weight_of[t] for t in self.terms])
+        self.postings = [np.fromiter(rows_of[t], dtype=np.int64) for t in self.terms]
+        # Rows where a term is a brand or name word (not only a category or size)
+        self.named_postings = [np.fromiter(named_rows_of.get(t, ()), dtype=np.int64) for t in self.terms]
+        self.totals = np.bincount(
+            np.concatenate(self.postings) if self.terms else np.empty(0, dtype=np.int64),
+            weights=np.repeat(self.weights, [len(p) for p in self.postings]),
+            minlength=len(self.names),
+        )
+        self.automaton = AhoCorasick(self.terms)
+
+    def terms_in(self, text):
+        """Catalog vocabulary found in the text."""
+        return sorted(self.terms[pid] for pid in self.automaton.find(clean_ocr_text(text)))
+
+    def _scores(self, text):
+        # Summed weight of matched terms and brand/name-word hits per row
+        found = list(self.automaton.find(clean_ocr_text(text)))
+        if not found:
+            return None, None
+        rows = np.concatenate([self.postings[pid] for pid in found])
+        hits = np.repeat(self.weights[found], [len(self.postings[pid]) for pid in found])
+        scores = np.bincount(rows, weights=hits, minlength=len(self.names))
+        named = np.bincount(np.concatenate([self.named_postings[pid] for pid in found]),
+                            minlength=len(self.names))
+        return scores, named
+
+    def candidates(self, text, k=5):
+        """Top-k (name, score) by summed weight of matched terms."""
+        scores, _ = self._scores(text)
+        if scores is None:
+            return []
+        top = np.flatnonzero(scores)
+        top = top[np.lexsort((top, -scores[top]))][:k]  # ties keep catalog order
+        return [(self.names[row], float(scores[row])) for row in top]
+
+    def best(self, text):
+        """
+        (name, evidence) of the top-ranked catalog name the text gives
+        enough evidence for, else (None, 0.0). evidence is the share of
+        the name's term weight found in the text, 0..1.
+        """
+        scores, named = self._scores(text)
+        if scores is None:
+            return None, 0.0
+        with np.errstate(invalid='ignore', divide='ignore'):
+            evidence = np.where(named > 0, scores / self.totals, 0.0)
+        eligible = np.flatnonzero(evidence >= MIN_NAME_EVIDENCE)
+        if not len(eligible):
+            return None, 0.0
+        row = eligible[np.lexsort((eligible, -scores[eligible]))][0]  # ties keep catalog order
+        return self.names[row], round(float(evidence[row]), 3)
+
+    def extract(self, all_text):
+        """
+        Best candidate name for the fuzzy matcher: the top-ranked catalog
+        name the text gives enough evidence for (see best()), else the
+        cleaned text itself.
+        """
+        name, _ = self.best(all_text)
+        if name is not None:
+            return name
+        return clean_ocr_text(all_text)[:64]
+
+
+def extract_product_name(all_text, products_df=None, extractor=None):
+    """Candidate product name from raw OCR text (see ProductNameExtractor)."""
+    return (extractor or ProductNameExtractor(products_df)).extract(all_text)
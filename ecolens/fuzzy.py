@@ -0,0 +1,93 @@
+import numpy as np
+
+from ecolens.search import ProductSearchIndex, normalize
+
+# Names scored exactly per query (the best trigram-overlap candidates)
+FUZZY_CANDIDATES = 64
+
+
+def edit_distances(query, candidates, max_distance=None):
+    """
+    Levenshtein distance from query to every candidate at once: one
+    numpy row update per query character over all candidates. With
+    max_distance, distances above it come back as max_distance + 1
+    and the loop stops as soon as every candidate is past the bound.
+    """
+    if not candidates:
+        return np.empty(0, dtype=np.int64)
+
+    width = max(1, max(len(c) for c in candidates))
+    padded = np.array(candidates, dtype=f"<U{width}")
+    chars = padded.view(np.uint32).reshape(len(candidates), width)
+    lengths = np.char.str_len(padded)
+    cols = np.arange(width + 1)
+    limit = np.iinfo(np.int64).max if max_distance is None else max_distance + 1
+
+    prev = np.tile(cols, (len(candidates), 1))
+    for i, ch in enumerate(query, 1):
+        cur = np.empty_like(prev)
+        cur[:, 0] = i
+        # substitution / match, then deletion
+        np.minimum(prev[:, :-1] + (chars != ord(ch)), prev[:, 1:] + 1, out=cur[:, 1:])
+        # insertion: cur[j] = min over k <= j of cur[k] + (j - k)
+        prev = np.minimum.accumulate(cur - cols, axis=1) + cols
+        if max_distance is not None and prev.min() >= limit:
+            break
+
+    return np.minimum(prev[np.arange(len(candidates)), lengths], limit)
+
+
+class FuzzyMatcher:
+    """
+    Fuzzy name matching for OCR'd product names. Candidates come from
+    the search index's trigram postings, then only those are scored
+    exactly (edit distance and token overlap) - never the whole catalog.
+    """
+
+    def __init__(self, summary_df, search=None):
+        self.search = search or ProductSearchIndex(summary_df)
+
+    def match(self, detected_name, k=5, min_confidence=0.0):
+        """Top-k (name, confidence) pairs, confidence in 0..1, best first."""
+        query = normalize(detected_name)
+        if not query:
+            return []
+
+        rows = self.search.trigram_search(query, FUZZY_CANDIDATES, min_overlap=0.3)
+        names = [self.search.names[row] for row in rows]
+        texts = [normalize(name) for name in names]
+        if not texts:
+            return []
+
+        # Edit similarity: 1 - distance / longer length
+        longest = np.maximum(len(query), [len(t) for t in texts])
+        distances = edit_distances(query, texts, max_distance=len(query))
+        edit_sim = 1 - np.minimum(distances, longest) / longest
+
+        # Token-set similarity (Dice): OCR often reorders or drops words
+        query_tokens = set(query.split())
+        token_sim = np.array([
+            2 * len(query_tokens & set(t.split())) / (len(query_tokens) + len(t.split()))
+            for t in texts
+        ])
+
+        confidence = np.maximum(edit_sim, token_sim)
+        order = np.argsort(-confidence, kind='stable')[:k]  # ties keep trigram rank
+        return [
+            (names[i], round(float(confidence[i]), 3))
+            for i in order
+            if confidence[i] >= min_confidence
+        ]
+
+    def best(self, detected_name):
+        """(name, confidence) of the best match, or (None, 0.0)."""
+        matches = self.match(detected_name, k=1)
+        return matches[0] if matches else (None, 0.0)
+
+
+def fuzzy_match_product(detected_name, summary_df, matcher=None):
+    """
+    Best catalog match for an OCR'd name as (name, confidence).
+    Pass Catalog.fuzzy as matcher to reuse the per-version index.
+    """
+    return (matcher or FuzzyMatcher(summary_df)).best(detected_name)
@@ -0,0 +1,203 @@
+"""
+HTTP client for the Hugging Face inference API.
+
+One HFClient per process: a pooled keep-alive session, connect/read
+timeouts, bounded retries with jittered backoff, the 503 "model is
+loading" state, and a circuit breaker so a dead endpoint fails fast
+instead of tying up Streamlit threads.
+"""
+import random
+import threading
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+
+# Worth retrying: rate limited, or the server side failed
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+# Worth retrying: the request never got a complete answer (no connection,
+# timed out, body cut off). Other request errors (bad URL) fail at once.
+TRANSIENT_ERRORS = (
+    requests.ConnectionError,
+    requests.Timeout,
+    requests.exceptions.ChunkedEncodingError,
+    requests.exceptions.ContentDecodingError,
+)
+
+
+class HFError(RuntimeError):
+    """The inference API could not produce an answer."""
+
+
+class ModelLoading(HFError):
+    """The model is still loading (cold start); retry after estimated_time."""
+
+    def __init__(self, estimated_time):
+        super().__init__(f"model is loading, ready in ~{estimated_time:.0f}s")
+        self.estimated_time = estimated_time
+
+
+class CircuitOpen(HFError):
+    """Too many recent failures; calls are refused until retry_at."""
+
+    def __init__(self, retry_at):
+        super().__init__("inference API circuit is open")
+        self.retry_at = retry_at
+
+
+class CircuitBreaker:
+    """
+    Opens after `threshold` consecutive failed calls; while open every
+    call is refused. After `reset_after` seconds one trial call is let
+    through (half-open): success closes the circuit, failure re-opens it.
+    """
+
+    def __init__(self, threshold=5, reset_after=30.0, clock=time.monotonic):
+        self.threshold = threshold
+        self.reset_after = reset_after
+        self.clock = clock
+        self.failures = 0
+        self.opened_at = None
+        self._trial = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self):
+        if self.opened_at is None:
+            return 'closed'
+        return 'half-open' if self.clock() - self.opened_at >= self.reset_after else 'open'
+
+    def before_call(self):
+        with self._lock:
+            state = self.state
+            if state == 'open' or (state == 'half-open' and self._trial):
+                raise CircuitOpen(self.opened_at + self.reset_after)
+            self._trial = state == 'half-open'
+
+    def record(self, ok):
+        with self._lock:
+            self._trial = False
+            if ok:
+                self.failures, self.opened_at = 0, None
+                return
+            self.failures += 1
+            if self.failures >= self.threshold or self.opened_at is not None:
+                self.opened_at = self.clock()
+
+
+class HFClient:
+    """
+    generate(prompt) -> generated text. Retries connection errors,
+    timeouts, truncated responses, 429 and 5xx up to `retries` times with full-jitter
+    exponential backoff (honouring Retry-After). A loading model (503
+    with estimated_time) is waited for up to max_loading_wait seconds
+    in total, then ModelLoading is raised. Other 4xx fail at once.
+    """
+
+    def __init__(self, api_url, token, connect_timeout=3.05, read_timeout=30.0, retries=3,
+                 backoff=0.5, max_backoff=8.0, max_loading_wait=30.0, pool_size=10,
+                 breaker=None, sleep=time.sleep):
+        self.api_url = api_url
+        self.timeout = (connect_timeout, read_timeout)
+        self.retries = retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.max_loading_wait = max_loading_wait
+        self.breaker = breaker or CircuitBreaker()
+        self.sleep = sleep
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+        self.session.headers['Authorization'] = f"Bearer {token}"
+
+    def _delay(self, attempt, retry_after=None):
+        if retry_after is not None:
+            return min(self.max_backoff, retry_after)
+        return random.uniform(0, min(self.max_backoff, self.backoff * 2 ** attempt))
+
+    def generate(self, prompt, parameters=None):
+        """Generated text for a prompt (raises HFError and subclasses)."""
+        self.breaker.before_call()
+        try:
+            text = self._generate(prompt, parameters)
+        except HFError as e:
+            # A loading model is up and answering; don't count it against the endpoint
+            self.breaker.record(ok=isinstance(e, ModelLoading))
+            raise
+        except BaseException:
+            # Always settle the call, or a failed half-open trial keeps the circuit shut
+            self.breaker.record(ok=False)
+            raise
+        self.breaker.record(ok=True)
+        return text
+
+    def _generate(self, prompt, parameters):
+        payload = {'inputs': prompt}
+        if parameters:
+            payload['parameters'] = parameters
+
+        attempt, loading_waited = 0, 0.0
+        while True:
+            response = None
+            try:
+                response = self.session.post(self.api_url, json=payload, timeout=self.timeout)
+            except TRANSIENT_ERRORS as e:
+                error = HFError(f"inference API unreachable: {e}")
+            except requests.RequestException as e:
+                raise HFError(f"inference API request failed: {e}") from e
+            else:
+                if response.status_code == 200:
+                    return self._text(response)
+
+                estimated = self._loading_time(response)
+                if estimated is not None:
+                    # Cold model: wait it out (bounded), without using up retries
+                    wait = min(estimated, self.max_loading_wait - loading_waited)
+                    if wait <= 0:
+                        raise ModelLoading(estimated)
+                    self.sleep(wait)
+                    loading_waited += wait
+                    continue
+
+                error = HFError(f"inference API returned {response.status_code}")
+                if response.status_code not in RETRY_STATUSES:
+                    raise error
+
+            if attempt >= self.retries:
+                raise error
+            self.sleep(self._delay(attempt, self._retry_after(response)))
+            attempt += 1
+
+    @staticmethod
+    def _text(response):
+        try:
+            return response.json()[0]['generated_text']
+        except (ValueError, LookupError, TypeError) as e:
+            raise HFError(f"unexpected inference API response: {e}") from e
+
+    @staticmethod
+    def _loading_time(response):
+        if response.status_code != 503:
+            return None
+        try:
+            body = response.json()
+        except ValueError:
+            return None
+        if isinstance(body, dict) and 'estimated_time' in body:
+            return float(body['estimated_time'])
+        return None
+
+    @staticmethod
+    def _retry_after(response):
+        if response is None or 'Retry-After' not in response.headers:
+            return None
+        try:
+            return float(response.headers['Retry-After'])
+        except ValueError:
+            return None
+
+    def close(self):
+        self.session.close()
@@ -0,0 +1,278 @@
+"""
+Durable per-user purchase history.
+
+Logged purchases go to an SQLite file (WAL, so every app process and
+session shares it) keyed by user id, so history survives refreshes and
+restarts. add() only queues rows; a background thread writes them in
+batches, so logging costs no more than before. Sessions keep a bounded
+tail of recent purchases in memory (tail()) and page through older
+ones on demand (page()).
+
+Each batch also updates daily, weekly and monthly rollups (UTC buckets)
+in the same transaction, so progress charts read a few hundred rows at
+most (rollup()) however long the history is.
+"""
+import atexit
+import logging
+import sqlite3
+import threading
+import time
+from datetime import date, datetime, timedelta, timezone
+from functools import lru_cache
+
+import pandas as pd
+
+from ecolens.impact_log import METRIC_COLUMNS
+
+log = logging.getLogger(__name__)
+
+HISTORY_FILE = 'impact-history.sqlite3'
+
+# Catalog columns stored per purchase (what ImpactLog.append/extend read)
+STORED_COLUMNS = ['name', 'category', *METRIC_COLUMNS.values()]
+
+# Purchases a session keeps in memory; older ones are paged in from disk
+TAIL_ROWS = 2000
+
+# Rows per page of the dashboard's impact log table
+PAGE_ROWS = 50
+
+ROLLUP_RESOLUTIONS = ('day', 'week', 'month')
+
+# A trend chart shows at most this many buckets; longer ranges use a coarser resolution
+ROLLUP_MAX_POINTS = 120
+
+# Dashboard trend ranges -> days back from today (None: all history)
+TREND_RANGES = {'Last 30 days': 30, 'Last 12 months': 365, 'All time': None}
+
+# Rollup sums, in table order
+_ROLLUP_SUMS = ['purchases', 'scored', 'score_sum', 'carbon', 'water', 'energy']
+
+
+def _plain(value):
+    # numpy scalars -> Python values sqlite3 can bind
+    return value.item() if hasattr(value, 'item') else value
+
+
+def bucket_starts(timestamp):
+    """Start date (ISO) of the day, week (Monday) and month bucket of a Unix time, in UTC."""
+    return _day_buckets(int(timestamp // 86400))
+
+
+@lru_cache(maxsize=1024)
+def _day_buckets(day_number):
+    day = date(1970, 1, 1) + timedelta(days=day_number)
+    return {
+        'day': day.isoformat(),
+        'week': (day - timedelta(days=day.weekday())).isoformat(),
+        'month': day.replace(day=1).isoformat(),
+    }
+
+
+def rollup_resolution(days, max_points=ROLLUP_MAX_POINTS):
+    """Finest resolution that shows a range of `days` days in at most max_points buckets."""
+    if days <= max_points:
+        return 'day'
+    if days <= max_points * 7:
+        return 'week'
+    return 'month'
+
+
+def _rollup_deltas(records):
+    # (user, resolution, bucket) -> summed _ROLLUP_SUMS for purchase records
+    # laid out as (user, logged_at, *STORED_COLUMNS)
+    deltas = {}
+    for user, logged_at, _, _, score, carbon, water, energy, _ in records:
+        scored = score is not None and score == score  # NaN scores are left out of the mean
+        values = (1, int(scored), score if scored else 0.0,
+                  *(v if v is not None and v == v else 0.0 for v in (carbon, water, energy)))
+        for resolution, bucket in bucket_starts(logged_at).items():
+            total = deltas.setdefault((user, resolution, bucket), [0, 0, 0.0, 0.0, 0.0, 0.0])
+            for i, v in enumerate(values):
+                total[i] += v
+    return [(*key, *total) for key, total in deltas.items()]
+
+
+class HistoryStore:
+    """
+    Append-only purchase log per user. Queued rows are written by a
+    background thread every flush_interval seconds, or at once when
+    batch_size rows are waiting; reads flush first so they always see
+    every add(). close() (also run at exit) writes what is left.
+    """
+
+    def __init__(self, path, batch_size=64, flush_interval=1.0):
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._pending = []
+        self._lock = threading.Lock()  # guards _pending
+        self._db_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._closed = False
+
+        self._db = sqlite3.connect(path, check_same_thread=False, timeout=10)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        with self._db:
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS purchases (id INTEGER PRIMARY KEY AUTOINCREMENT, "
+                "user TEXT NOT NULL, logged_at REAL, name TEXT, category TEXT, eco_score REAL, "
+                "total_carbon_kg REAL, total_water_L REAL, total_energy_MJ REAL, total_waste_score REAL)"
+            )
+            self._db.execute("CREATE INDEX IF NOT EXISTS purchases_user ON purchases (user, id)")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS rollups (user TEXT, resolution TEXT, bucket TEXT, "
+                "purchases INTEGER, scored INTEGER, score_sum REAL, carbon REAL, water REAL, energy REAL, "
+                "PRIMARY KEY (user, resolution, bucket)) WITHOUT ROWID"
+            )
+            # History written before rollups existed: roll it up once
+            if not self._db.execute("SELECT 1 FROM rollups LIMIT 1").fetchone():
+                self._add_rollups(self._db.execute(
+                    f"SELECT user, logged_at, {', '.join(STORED_COLUMNS)} FROM purchases"
+                ).fetchall())
+
+        self._writer = threading.Thread(target=self._run, name='history-writer', daemon=True)
+        self._writer.start()
+        atexit.register(self.close)
+
+    def add(self, user, rows):
+        """Queue purchases for a user: one scored catalog row (Series) or a DataFrame of them."""
+        now = time.time()
+        if isinstance(rows, pd.DataFrame):
+            columns = zip(*(rows[column].tolist() for column in STORED_COLUMNS))
+            records = [(user, now, *values) for values in columns]
+        else:
+            records = [(user, now, *(_plain(rows[column]) for column in STORED_COLUMNS))]
+        with self._lock:
+            self._pending.extend(records)
+            full = len(self._pending) >= self.batch_size
+        if full:
+            self._wake.set()
+
+    def _run(self):
+        while not self._closed:
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            try:
+                self.flush()
+            except Exception:
+                # Keep the writer alive; a failed batch is queued again (see flush)
+                log.exception("writing impact history failed")
+
+    def flush(self):
+        """
+        Write every queued purchase in one transaction. If the database
+        is busy or unavailable (OperationalError) the batch goes back to
+        the front of the queue for the next flush, and the error is raised.
+        """
+        with self._db_lock:
+            with self._lock:
+                batch, self._pending = self._pending, []
+            if not batch:
+                return
+            try:
+                with self._db:
+                    self._db.executemany(
+                        f"INSERT INTO purchases (user, logged_at, {', '.join(STORED_COLUMNS)}) "
+                        f"VALUES ({', '.join('?' * (len(STORED_COLUMNS) + 2))})",
+                        batch,
+                    )
+                    self._add_rollups(batch)
+            except sqlite3.OperationalError:
+                with self._lock:
+                    self._pending[:0] = batch
+                raise
+
+    def _add_rollups(self, records):
+        if not records:
+            return
+        updates = ', '.join(f"{c} = {c} + excluded.{c}" for c in _ROLLUP_SUMS)
+        self._db.executemany(
+            f"INSERT INTO rollups VALUES (?, ?, ?, {', '.join('?' * len(_ROLLUP_SUMS))}) "
+            f"ON CONFLICT (user, resolution, bucket) DO UPDATE SET {updates}",
+            _rollup_deltas(records),
+        )
+
+    def _query(self, sql, params):
+        self.flush()
+        with self._db_lock:
+            return self._db.execute(sql, params).fetchall()
+
+    def count(self, user):
+        return self._query("SELECT COUNT(*) FROM purchases WHERE user = ?", (user,))[0][0]
+
+    def tail(self, user, n=TAIL_ROWS):
+        """A user's latest n purchases, oldest first, as STORED_COLUMNS (for ImpactLog.extend)."""
+        rows = self._query(
+            f"SELECT {', '.join(STORED_COLUMNS)} FROM purchases WHERE user = ? ORDER BY id DESC LIMIT ?",
+            (user, n),
+        )
+        return pd.DataFrame(rows[::-1], columns=STORED_COLUMNS)
+
+    def page(self, user, page=0, page_size=PAGE_ROWS):
+        """One page of a user's purchases, newest first, with dashboard column names and log time."""
+        rows = self._query(
+            f"SELECT logged_at, {', '.join(STORED_COLUMNS)} FROM purchases WHERE user = ? "
+            "ORDER BY id DESC LIMIT ? OFFSET ?",
+            (user, page_size, page * page_size),
+        )
+        df = pd.DataFrame(rows, columns=['logged_at', *STORED_COLUMNS])
+        df['logged_at'] = pd.to_datetime(df['logged_at'], unit='s').dt.floor('s')
+        return df.rename(columns={
+            'logged_at': 'Logged', 'name': 'Product', 'category': 'Category',
+            **{column: name for name, column in METRIC_COLUMNS.items()},
+        })
+
+    def first_logged(self, user):
+        """Date of a user's first purchase, or None."""
+        rows = self._query("SELECT MIN(bucket) FROM rollups WHERE user = ? AND resolution = 'day'", (user,))
+        return date.fromisoformat(rows[0][0]) if rows[0][0] else None
+
+    def rollup(self, user, resolution, since=None):
+        """
+        A user's purchases per day / week / month bucket (from `since`, a
+        date, when given): Period, Products, Avg Eco Score and total
+        Carbon (kg), Water (L) and Energy (MJ), oldest first.
+        """
+        sql = ("SELECT bucket, purchases, score_sum / NULLIF(scored, 0), carbon, water, energy "
+               "FROM rollups WHERE user = ? AND resolution = ?")
+        params = [user, resolution]
+        if since is not None:
+            sql += " AND bucket >= ?"
+            params.append(bucket_starts(datetime.combine(since, datetime.min.time(), timezone.utc)
+                                        .timestamp())[resolution])
+        df = pd.DataFrame(
+            self._query(sql + " ORDER BY bucket", params),
+            columns=['Period', 'Products', 'Avg Eco Score', 'Carbon (kg)', 'Water (L)', 'Energy (MJ)'],
+        )
+        df['Period'] = pd.to_datetime(df['Period'])
+        return df
+
+    def trend(self, user, days=None, today=None):
+        """
+        (resolution, rollup) for a user's last `days` days (all history
+        when None), at the finest resolution that stays within
+        ROLLUP_MAX_POINTS buckets.
+        """
+        today = today or datetime.now(timezone.utc).date()
+        first = self.first_logged(user) or today
+        since = max(first, today - timedelta(days=days - 1)) if days else first
+        resolution = rollup_resolution((today - since).days + 1)
+        return resolution, self.rollup(user, resolution, since)
+
+    def clear(self, user):
+        """Delete a user's whole history (queued rows included)."""
+        self.flush()
+        with self._db_lock, self._db:
+            self._db.execute("DELETE FROM purchases WHERE user = ?", (user,))
+            self._db.execute("DELETE FROM rollups WHERE user = ?", (user,))
+
+    def close(self):
+        if self._closed:
+            return
+        self._closed = True
+        self._wake.set()
+        self._writer.join()
+        self.flush()
+        with self._db_lock:
+            self._db.close()
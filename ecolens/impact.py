@@ -0,0 +1,90 @@
+import numpy as np
+import pandas as pd
+
+# Number of material_{j} / weight_{j}_g slot pairs in product.csv
+MATERIAL_SLOTS = 3
+
+# material.csv column -> product total column
+IMPACT_FACTORS = {
+    'carbon_kg_per_kg': 'total_carbon_kg',
+    'water_L_per_kg': 'total_water_L',
+    'energy_MJ_per_kg': 'total_energy_MJ',
+}
+
+IMPACT_COLUMNS = [
+    'total_carbon_kg',
+    'total_water_L',
+    'total_energy_MJ',
+    'total_waste_score',
+]
+
+
+def encode_materials(products_df, materials_df, slots=MATERIAL_SLOTS):
+    """
+    Map every material_{j} cell to an integer row of materials_df.
+    Returns (codes, weights_kg, materials): two (n_products, slots) arrays
+    plus the de-duplicated material table the codes index into. Unusable
+    slots (blank material, blank weight, unknown material) get code -1
+    and weight 0.
+    """
+    # Later duplicates win, same as building a dict row by row
+    materials = materials_df.drop_duplicates('material', keep='last')
+    lookup = pd.Index(materials['material'])
+
+    n = len(products_df)
+    codes = np.full((n, slots), -1, dtype=np.intp)
+    weights_kg = np.zeros((n, slots), dtype=np.float64)
+
+    for j in range(slots):
+        mat_col, weight_col = f'material_{j + 1}', f'weight_{j + 1}_g'
+        if mat_col not in products_df.columns or weight_col not in products_df.columns:
+            continue
+
+        material = products_df[mat_col]
+        weight_g = products_df[weight_col].to_numpy(dtype=np.float64)
+
+        slot_codes = lookup.get_indexer(material)
+        valid = (slot_codes >= 0) & material.notna().to_numpy() & ~np.isnan(weight_g)
+
+        codes[valid, j] = slot_codes[valid]
+        weights_kg[valid, j] = weight_g[valid] / 1000
+
+    return codes, weights_kg, materials
+
+
+def compute_impact(products_df, materials_df, slots=MATERIAL_SLOTS):
+    """
+    Vectorized environmental impact for the whole catalog.
+    Returns a DataFrame (same index as products_df) with total carbon,
+    water and energy (mass-scaled) and the mean material waste score.
+    """
+    codes, weights_kg, materials = encode_materials(products_df, materials_df, slots)
+    valid = codes >= 0
+
+    # Extra zero row at the end so code -1 gathers a harmless 0
+    def factor_table(col):
+        return np.append(materials[col].to_numpy(dtype=np.float64), 0.0)
+
+    result = pd.DataFrame(index=products_df.index)
+
+    for factor_col, total_col in IMPACT_FACTORS.items():
+        factors = factor_table(factor_col)[codes]
+        total = np.zeros(len(products_df))
+        # Accumulate slot by slot so the floats match the old per-row loop
+        for j in range(slots):
+            total += weights_kg[:, j] * factors[:, j]
+        result[total_col] = total
+
+    # Waste is a material-type penalty (not mass-scaled)
+    waste = factor_table('waste_score')[codes]
+    waste_sum = np.zeros(len(products_df))
+    for j in range(slots):
+        waste_sum += waste[:, j]
+    waste_count = valid.sum(axis=1)
+    result['total_waste_score'] = np.divide(
+        waste_sum, waste_count,
+        out=np.zeros(len(products_df)),
+        where=waste_count > 0
+    )
+
+    return result[IMPACT_COLUMNS]
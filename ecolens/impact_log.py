@@ -0,0 +1,237 @@
+import os
+
+import numpy as np
+import pandas as pd
+
+# Dashboard column -> scored catalog column
+METRIC_COLUMNS = {
+    'Eco Score': 'eco_score',
+    'Carbon (kg)': 'total_carbon_kg',
+    'Water (L)': 'total_water_L',
+    'Energy (MJ)': 'total_energy_MJ',
+    'Waste Score': 'total_waste_score',
+}
+
+HISTORY_COLUMNS = ['Product', 'Category', *METRIC_COLUMNS]
+
+# Eco score from which a purchase counts as a high-eco choice
+HIGH_ECO_SCORE = 80
+
+# ECOLENS_VERIFY_AGGREGATES=1 re-checks every aggregates() read against a full recompute
+VERIFY_AGGREGATES = os.environ.get('ECOLENS_VERIFY_AGGREGATES') == '1'
+
+
+def _same(got, expected):
+    # Equal up to float rounding of the running sums; NaN matches NaN
+    if isinstance(expected, float) and isinstance(got, float):
+        return bool(np.isclose(got, expected, rtol=1e-9, atol=1e-9, equal_nan=True))
+    return got == expected
+
+
+class _Codes:
+    # Growable categorical column: values -> int32 codes plus the distinct values
+    def __init__(self):
+        self.values = []
+        self.index = {}
+
+    def encode(self, value):
+        if pd.isna(value):
+            return -1  # missing, like pandas' own categorical codes
+        code = self.index.get(value)
+        if code is None:
+            code = self.index[value] = len(self.values)
+            self.values.append(value)
+        return code
+
+
+class ImpactLog:
+    """
+    Append-only purchase log in typed, growable columns: product and
+    category as int32 codes, the metrics as one float32 array per
+    column. Appends are amortized O(1) (capacity doubles when full), and
+    frame() hands out a DataFrame whose metric columns are views of the
+    arrays, built only when the log changed since the last call.
+
+    The dashboard aggregates (count, sum, mean, min, max, high-eco count,
+    first-to-last eco score change, per-category counts) are updated as
+    rows are logged, so reading them costs O(1). With verify=True every
+    aggregates() call is checked against a full recompute.
+    """
+
+    def __init__(self, capacity=64, verify=VERIFY_AGGREGATES):
+        self.verify = verify
+        self._size = 0
+        self._allocate(capacity)
+
+    def _allocate(self, capacity):
+        self._products, self._categories = _Codes(), _Codes()
+        self._product_codes = np.empty(capacity, dtype=np.int32)
+        self._category_codes = np.empty(capacity, dtype=np.int32)
+        self._metrics = np.empty((len(METRIC_COLUMNS), capacity), dtype=np.float32)
+        self._frame = None
+
+        # Running aggregates, float64 over the stored float32 values; NaNs are skipped like pandas does
+        self._counts = np.zeros(len(METRIC_COLUMNS), dtype=np.int64)
+        self._sums = np.zeros(len(METRIC_COLUMNS), dtype=np.float64)
+        self._mins = np.full(len(METRIC_COLUMNS), np.nan)
+        self._maxs = np.full(len(METRIC_COLUMNS), np.nan)
+        self._high_eco = 0
+        self._category_counts = []
+
+    def __len__(self):
+        return self._size
+
+    def _reserve(self, extra):
+        needed = self._size + extra
+        capacity = len(self._product_codes)
+        if needed <= capacity:
+            return
+        while capacity < needed:
+            capacity *= 2
+        # Fresh buffers: frames handed out earlier keep viewing the old ones
+        n = self._size
+        product_codes, category_codes, metrics = self._product_codes, self._category_codes, self._metrics
+        self._product_codes = np.empty(capacity, dtype=np.int32)
+        self._category_codes = np.empty(capacity, dtype=np.int32)
+        self._metrics = np.empty((len(METRIC_COLUMNS), capacity), dtype=np.float32)
+        self._product_codes[:n] = product_codes[:n]
+        self._category_codes[:n] = category_codes[:n]
+        self._metrics[:, :n] = metrics[:, :n]
+
+    def append(self, r):
+        """Log one scored catalog row (Series or dict)."""
+        self._reserve(1)
+        i = self._size
+        self._product_codes[i] = self._products.encode(r['name'])
+        self._category_codes[i] = self._categories.encode(r['category'])
+        self._metrics[:, i] = [r[column] for column in METRIC_COLUMNS.values()]
+        self._size += 1
+        self._frame = None
+        self._add(i, i + 1)
+
+    def extend(self, rows):
+        """Log every row of a scored catalog slice (DataFrame)."""
+        n = len(rows)
+        if not n:
+            return
+        self._reserve(n)
+        i = self._size
+        self._product_codes[i:i + n] = [self._products.encode(v) for v in rows['name']]
+        self._category_codes[i:i + n] = [self._categories.encode(v) for v in rows['category']]
+        self._metrics[:, i:i + n] = rows[list(METRIC_COLUMNS.values())].to_numpy(dtype=np.float32).T
+        self._size += n
+        self._frame = None
+        self._add(i, i + n)
+
+    def _add(self, start, stop):
+        # Fold rows start:stop into the running aggregates
+        block = self._metrics[:, start:stop].astype(np.float64)
+        present = ~np.isnan(block)
+        self._counts += present.sum(axis=1)
+        self._sums += np.where(present, block, 0.0).sum(axis=1)
+        with np.errstate(invalid='ignore'):
+            self._mins = np.fmin(self._mins, np.nanmin(block, axis=1, initial=np.inf, where=present))
+            self._maxs = np.fmax(self._maxs, np.nanmax(block, axis=1, initial=-np.inf, where=present))
+        self._mins[np.isinf(self._mins)] = np.nan
+        self._maxs[np.isinf(self._maxs)] = np.nan
+        self._high_eco += int((block[0] >= HIGH_ECO_SCORE).sum())
+
+        codes = self._category_codes[start:stop]
+        counts = np.bincount(codes[codes >= 0], minlength=len(self._categories.values))
+        self._category_counts.extend([0] * (len(counts) - len(self._category_counts)))
+        for code in np.flatnonzero(counts):
+            self._category_counts[code] += int(counts[code])
+
+    def clear(self):
+        # New buffers, so frames handed out earlier are never overwritten
+        self._size = 0
+        self._allocate(64)
+
+    def aggregates(self):
+        """
+        Dashboard aggregates, O(1) (plus one entry per category):
+        count, high_eco, delta (last - first eco score, None below two
+        rows), category_counts, and sum / mean / min / max dicts keyed by
+        metric column (NaN where a metric has no values).
+        """
+        names = list(METRIC_COLUMNS)
+        n = self._size
+        with np.errstate(invalid='ignore', divide='ignore'):
+            means = self._sums / self._counts
+        aggregates = {
+            'count': n,
+            'sum': dict(zip(names, self._sums.tolist())),
+            'mean': dict(zip(names, means.tolist())),
+            'min': dict(zip(names, self._mins.tolist())),
+            'max': dict(zip(names, self._maxs.tolist())),
+            'high_eco': self._high_eco,
+            'delta': float(self._metrics[0, n - 1]) - float(self._metrics[0, 0]) if n >= 2 else None,
+            'category_counts': {
+                category: count
+                for category, count in zip(self._categories.values, self._category_counts) if count
+            },
+        }
+        if self.verify:
+            self.check(aggregates)
+        return aggregates
+
+    def recompute(self):
+        """The aggregates() values computed from scratch with pandas (for checking)."""
+        history = self.frame()
+        metrics = history[list(METRIC_COLUMNS)].astype(np.float64)
+        scores = history['Eco Score']
+        counts = history['Category'].value_counts(sort=False)
+        return {
+            'count': len(history),
+            'sum': metrics.sum().to_dict(),
+            'mean': metrics.mean().to_dict(),
+            'min': metrics.min().to_dict(),
+            'max': metrics.max().to_dict(),
+            'high_eco': int((scores >= HIGH_ECO_SCORE).sum()),
+            'delta': float(scores.iloc[-1]) - float(scores.iloc[0]) if len(history) >= 2 else None,
+            'category_counts': {category: int(count) for category, count in counts.items() if count},
+        }
+
+    def check(self, aggregates=None):
+        """Raise ValueError if the running aggregates drifted from a full recompute."""
+        aggregates = aggregates or self.aggregates()
+        expected = self.recompute()
+        mismatches = []
+        for key, value in expected.items():
+            if isinstance(value, dict) and key != 'category_counts':
+                mismatches += [
+                    f"{key}[{name}]: {aggregates[key][name]!r} != {v!r}"
+                    for name, v in value.items() if not _same(aggregates[key][name], v)
+                ]
+            elif not _same(aggregates[key], value):
+                mismatches.append(f"{key}: {aggregates[key]!r} != {value!r}")
+        if mismatches:
+            raise ValueError("impact aggregates out of sync: " + "; ".join(mismatches))
+
+    def column(self, name):
+        """Read-only float32 view of one metric column (HISTORY_COLUMNS name)."""
+        view = self._metrics[list(METRIC_COLUMNS).index(name), :self._size]
+        view.flags.writeable = False
+        return view
+
+    def frame(self):
+        """
+        The log as a DataFrame (HISTORY_COLUMNS, oldest first). Metric
+        columns share memory with the log; treat the frame as read-only.
+        """
+        if self._frame is None:
+            n = self._size
+            columns = {
+                'Product': pd.Categorical.from_codes(
+                    self._product_codes[:n], categories=pd.Index(self._products.values, dtype=object),
+                    validate=False,
+                ),
+                'Category': pd.Categorical.from_codes(
+                    self._category_codes[:n], categories=pd.Index(self._categories.values, dtype=object),
+                    validate=False,
+                ),
+            }
+            for name in METRIC_COLUMNS:
+                columns[name] = self.column(name)
+            self._frame = pd.DataFrame(columns, copy=False)
+        return self._frame
@@ -0,0 +1,226 @@
+"""
+Zero-LLM fast path for the chatbots.
+
+Lookup questions ("eco score of Nivea Cream 75ml", "compare X and Y",
+"greenest sunscreen", "alternatives to X") are answered straight from
+the scored catalog and the alternatives table in well under a
+millisecond. Anything the router does not recognise, or whose product
+or category it cannot resolve confidently, returns None and goes to
+the model as before.
+"""
+import re
+
+import numpy as np
+
+from ecolens.retrieval import FLAG_LABELS
+from ecolens.search import normalize
+
+# Below this fuzzy confidence a name is not trusted; the model answers instead
+MIN_NAME_CONFIDENCE = 0.75
+
+METRICS = {
+    'carbon': ('total_carbon_kg', "carbon", "kg CO₂e"),
+    'water': ('total_water_L', "water", "L"),
+    'energy': ('total_energy_MJ', "energy", "MJ"),
+    'waste': ('total_waste_score', "waste score", ""),
+}
+
+# Patterns run on normalize()d questions: lowercase, no punctuation
+_LEAD = r"^(?:(?:what|which|who)(?: s| is| are)? |tell me |show me |give me |find )?(?:the |a |an )?"
+_COMPARE = [
+    re.compile(r"^(?:please )?compare (?:the )?(?P<a>.+?) (?:and|with|to|vs|versus) (?:the )?(?P<b>.+)$"),
+    re.compile(r"^(?:which is (?:greener|better|more eco friendly|more sustainable) )?(?:the )?"
+               r"(?P<a>.+?) (?:vs|versus|or) (?:the )?(?P<b>.+?)(?: which is (?:greener|better))?$"),
+]
+_ALTERNATIVES = re.compile(
+    _LEAD + r"(?:greener |eco friendly |better |more sustainable )?(?:alternatives?|swaps?|options?) "
+            r"(?:to|for|instead of) (?:the )?(?P<a>.+)$"
+)
+_BEST = re.compile(
+    _LEAD + r"(?:greenest|most eco friendly|most sustainable|best|top) (?P<c>.+?)(?: products?)?$"
+)
+_LOWEST = re.compile(
+    _LEAD + r"(?:lowest|least) (?P<m>carbon|water|energy|waste)(?: footprint| impact| use| score)? "
+            r"(?P<c>.+?)(?: products?)?$"
+)
+_SCORE = [
+    re.compile(_LEAD + r"(?:eco ?score|green ?score|score|rating) (?:of|for) (?:the )?(?P<a>.+)$"),
+    re.compile(r"^how (?:green|eco friendly|sustainable|good for the planet) is (?:the )?(?P<a>.+)$"),
+    re.compile(_LEAD + r"(?P<a>.+?) (?:eco ?score|green ?score)$"),
+]
+
+
+_SIZE = re.compile(r"\b\d+(?:\.\d+)?\s?(?:ml|l|g|kg|oz|mg)\b")
+
+
+def _name_key(text):
+    # People drop pack sizes and spell brands loosely: "loreal shampoo"
+    return _SIZE.sub(" ", normalize(text)).replace(" ", "")
+
+
+def _plurals(name):
+    yield name
+    yield name + "s"
+    yield name + "es"
+
+
+class IntentRouter:
+    """
+    Deterministic answers for structured catalog questions. Build once
+    per catalog version (Catalog.intents); answer() returns markdown or
+    None when the question needs the model.
+    """
+
+    def __init__(self, summary_df, products, matcher, alternatives_table):
+        self.summary_df = summary_df
+        self.products = products
+        self.matcher = matcher
+        self.alternatives_table = alternatives_table
+
+        # Exact names first, then names without sizes or spaces
+        self.names_by_text, self.names_by_key = {}, {}
+        for name in products.row_by_name:
+            self.names_by_text.setdefault(normalize(name), name)
+            self.names_by_key.setdefault(_name_key(name), name)
+
+        self.categories = {}
+        for category in summary_df['category'].dropna().unique():
+            for text in _plurals(normalize(category)):
+                self.categories.setdefault(text, category)
+
+        # Row position of each category's lowest value per metric
+        positions = summary_df.reset_index(drop=True)
+        columns = [column for column, _, _ in METRICS.values()]
+        self.lowest = positions.groupby('category')[columns].idxmin()
+
+    def answer(self, question):
+        """Markdown answer for a lookup question, or None."""
+        text = normalize(question)
+        if not text:
+            return None
+
+        for pattern in _COMPARE:
+            m = pattern.match(text)
+            if m:
+                a, b = self._product(m['a']), self._product(m['b'])
+                if a is not None and b is not None and a != b:
+                    return self._compare(a, b)
+
+        m = _ALTERNATIVES.match(text)
+        if m:
+            row = self._product(m['a'])
+            if row is not None:
+                return self._alternatives(row)
+            category = self.categories.get(m['a'])
+            if category is not None:
+                return self._best(category)
+
+        m = _LOWEST.match(text)
+        if m and m['c'] in self.categories:
+            return self._lowest(self.categories[m['c']], m['m'])
+
+        m = _BEST.match(text)
+        if m and m['c'] in self.categories:
+            return self._best(self.categories[m['c']])
+
+        for pattern in _SCORE:
+            m = pattern.match(text)
+            if m:
+                row = self._product(m['a'])
+                if row is not None:
+                    return self._score(row)
+        return None
+
+    def _product(self, text):
+        """Row position of the product a question names, or None if unsure."""
+        name = self.names_by_text.get(text) or self.names_by_key.get(_name_key(text))
+        if name is None:
+            name, confidence = self.matcher.best(text)
+            if confidence < MIN_NAME_CONFIDENCE:
+                return None
+        return self.products.row_by_name.get(name)
+
+    def _row(self, pos):
+        return self.summary_df.iloc[pos]
+
+    @staticmethod
+    def _impacts(r):
+        return [
+            f"{label.capitalize()}: {r[column]:.3g} {unit}".rstrip()
+            for column, label, unit in METRICS.values()
+        ]
+
+    def _flags(self, r):
+        return [text for flag, text in FLAG_LABELS.items() if flag in r.index and bool(r[flag])]
+
+    def _score(self, pos):
+        r = self._row(pos)
+        lines = [f"**{r['name']}** ({r['category']}) has an eco score of **{r['eco_score']:g}/100**."]
+        lines += [f"- {line}" for line in self._impacts(r)]
+        flags = self._flags(r)
+        if flags:
+            lines.append(f"- Notes: {', '.join(flags)}")
+        better = self.alternatives_table.for_product(r['name'], max_alternatives=1)
+        if better:
+            alt = better[0]
+            lines.append(f"\nGreener pick: **{alt['name']}** ({alt['eco_score']:g}/100, {alt['improvement']}).")
+        return "\n".join(lines)
+
+    def _compare(self, a, b):
+        ra, rb = self._row(a), self._row(b)
+        lines = [
+            f"| | {ra['name']} | {rb['name']} |",
+            "|---|---|---|",
+            f"| Eco score | {ra['eco_score']:g}/100 | {rb['eco_score']:g}/100 |",
+        ]
+        for column, label, unit in METRICS.values():
+            header = f"{label.capitalize()} ({unit})" if unit else label.capitalize()
+            lines.append(f"| {header} | {ra[column]:.3g} | {rb[column]:.3g} |")
+
+        diff = ra['eco_score'] - rb['eco_score']
+        if diff == 0:
+            verdict = "Both have the same eco score."
+        else:
+            greener, other = (ra, rb) if diff > 0 else (rb, ra)
+            verdict = f"**{greener['name']}** is greener by {abs(diff):g} points than {other['name']}."
+        if ra['category'] != rb['category']:
+            verdict += f" Note they are different product types ({ra['category']} vs {rb['category']})."
+        # Verdict first: the pages prefix replies with a speaker label
+        return verdict + "\n\n" + "\n".join(lines)
+
+    def _alternatives(self, pos):
+        r = self._row(pos)
+        alternatives = self.alternatives_table.for_product(r['name'], max_alternatives=3)
+        if not alternatives:
+            return (
+                f"No {r['category'].lower()} in the catalog scores higher than "
+                f"**{r['name']}** ({r['eco_score']:g}/100). 🌱"
+            )
+        lines = [f"Greener alternatives to **{r['name']}** ({r['eco_score']:g}/100):"]
+        lines += [
+            f"{i}. **{alt['name']}**: {alt['eco_score']:g}/100, +{alt['score_diff']:g} points, {alt['improvement']}"
+            for i, alt in enumerate(alternatives, 1)
+        ]
+        return "\n".join(lines)
+
+    def _best(self, category):
+        index = self.alternatives_table.index
+        code = index.categories.get_loc(category)
+        rows = index.order[index.bounds[code]:index.bounds[code + 1]][:3]
+        lines = [f"Greenest {category.lower()} products in the catalog:"]
+        lines += [
+            f"{i}. **{index.names[row]}**: {index.scores[row]:g}/100"
+            for i, row in enumerate(rows, 1)
+        ]
+        return "\n".join(lines)
+
+    def _lowest(self, category, metric):
+        column, label, unit = METRICS[metric]
+        pos = self.lowest.at[category, column]
+        if not isinstance(pos, (int, np.integer)):
+            return None
+        r = self._row(pos)
+        return (
+            f"Lowest {label} {category.lower()}: **{r['name']}** with {r[column]:.3g} {unit}".rstrip()
+            + f" (eco score {r['eco_score']:g}/100)."
+        )
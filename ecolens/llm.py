@@ -0,0 +1,110 @@
+"""
+OpenAI chat client shared by the whole process.
+
+openai is imported on first use only, so the apps that don't chat
+through OpenAI don't need it installed.
+"""
+import atexit
+import threading
+
+# Requests (open streams included) in flight at once per process
+DEFAULT_MAX_CONCURRENCY = 8
+
+
+class _HeldStream:
+    # A streamed completion that holds one request slot until it is read through or closed
+
+    def __init__(self, stream, release):
+        self._stream = stream
+        self._release = release
+
+    def __iter__(self):
+        try:
+            yield from self._stream
+        finally:
+            self.close()
+
+    def close(self):
+        if self._release is not None:
+            release, self._release = self._release, None
+            self._stream.close()
+            release()
+
+    __del__ = close
+
+
+class LLMClient:
+    """
+    One lazily created OpenAI client for every session and rerun, so chat
+    calls reuse pooled keep-alive connections instead of a new client
+    (and TLS handshake) per message. chat() keeps at most max_concurrency
+    requests in flight (a stream counts until it is read or closed);
+    further calls wait up to pool_timeout for a free slot. close() (also
+    run at exit) shuts the client down.
+    """
+
+    def __init__(self, api_key, max_concurrency=DEFAULT_MAX_CONCURRENCY, timeout=60.0,
+                 pool_timeout=30.0, max_retries=2, base_url=None):
+        self.api_key = api_key
+        self.max_concurrency = max_concurrency
+        self.timeout = timeout
+        self.pool_timeout = pool_timeout
+        self.max_retries = max_retries
+        self.base_url = base_url  # None: OPENAI_BASE_URL or the public API
+        self._client = None
+        self._lock = threading.Lock()
+        self._slots = threading.BoundedSemaphore(max_concurrency)
+
+    @property
+    def client(self):
+        """The openai.OpenAI instance, created on first access."""
+        with self._lock:
+            if self._client is None:
+                import openai
+
+                self._client = openai.OpenAI(
+                    api_key=self.api_key,
+                    base_url=self.base_url,
+                    timeout=self.timeout,
+                    max_retries=self.max_retries,
+                )
+                atexit.register(self.close)
+            return self._client
+
+    def chat(self, **kwargs):
+        """
+        client.chat.completions.create(**kwargs) within the concurrency
+        cap. Raises TimeoutError when no slot frees up in pool_timeout.
+        """
+        client = self.client
+        if not self._slots.acquire(timeout=self.pool_timeout):
+            raise TimeoutError(f"no free OpenAI request slot after {self.pool_timeout:g}s")
+        try:
+            response = client.chat.completions.create(**kwargs)
+        except BaseException:
+            self._slots.release()
+            raise
+        if kwargs.get('stream'):
+            return _HeldStream(response, self._slots.release)
+        self._slots.release()
+        return response
+
+    def close(self):
+        with self._lock:
+            if self._client is not None:
+                self._client.close()
+                self._client = None
+
+
+def stream_text(stream, usage=None):
+    """
+    Text deltas of a streamed chat completion (stream=True), for
+    st.write_stream. Role-only and empty chunks are skipped. Pass a dict
+    as usage to receive the token counts of the final chunk (requested
+    with stream_options={"include_usage": True}).
+    """
+    for chunk in stream:
+        if usage is not None and getattr(chunk, 'usage', None):
+            usage.update(chunk.usage.model_dump())
+        if chunk.choices and chunk.choices[0].delta.content:
+            yield chunk.choices[0].delta.content
@@ -0,0 +1,50 @@
+import numpy as np
+import pandas as pd
+
+
+def product_ids(names):
+    """
+    Stable id per product: a 64-bit hash of its name, so the same
+    product keeps its id across catalog versions. Repeated names are
+    told apart by their occurrence number.
+    """
+    names = pd.Series(names).reset_index(drop=True)
+    occurrence = names.groupby(names, dropna=False).cumcount()
+    keyed = pd.DataFrame({'name': names.fillna(''), 'occurrence': occurrence})
+    return pd.util.hash_pandas_object(keyed, index=False).to_numpy(dtype=np.uint64)
+
+
+class ProductIndex:
+    """
+    Hash indexes over a scored catalog, built once per catalog version:
+    name -> row position (first row wins, like a boolean mask + iloc[0])
+    and product_id -> row position.
+    """
+
+    def __init__(self, summary_df):
+        self.summary_df = summary_df
+        names = summary_df['name'].tolist()
+
+        self.row_by_name = {}
+        for i, name in enumerate(names):
+            if isinstance(name, str):
+                self.row_by_name.setdefault(name, i)
+
+        self.row_by_id = dict(zip(summary_df['product_id'].tolist(), range(len(names))))
+
+    def __contains__(self, name):
+        return name in self.row_by_name
+
+    def row(self, name):
+        """Catalog row (Series) for a product name, or None."""
+        pos = self.row_by_name.get(name)
+        return None if pos is None else self.summary_df.iloc[pos]
+
+    def frame(self, name):
+        """One-row DataFrame for a product name (empty if unknown)."""
+        pos = self.row_by_name.get(name)
+        return self.summary_df.iloc[[] if pos is None else [pos]]
+
+    def row_for_id(self, product_id):
+        pos = self.row_by_id.get(product_id)
+        return None if pos is None else self.summary_df.iloc[pos]
@@ -0,0 +1,77 @@
+from ecolens.tokenizer import MESSAGE_OVERHEAD, count_message_tokens, count_tokens
+
+# Prompt tokens per chat request (system prompt + context + kept turns)
+CHAT_TOKEN_BUDGET = 3000
+
+# At most this much of the budget goes to the summary of dropped turns
+SUMMARY_TOKEN_BUDGET = 300
+
+
+def _summary(dropped, budget):
+    # Extractive, no model call: the questions asked so far, newest kept first
+    lines = []
+    used = count_tokens("Earlier in this conversation the user asked:")
+    for m in reversed(dropped):
+        if m['role'] != 'user':
+            continue
+        line = "- " + " ".join(m['content'].split())
+        cost = count_tokens(line) + 1
+        if used + cost > budget:
+            break
+        lines.append(line)
+        used += cost
+    if not lines:
+        return None
+    return {
+        'role': 'system',
+        'content': "Earlier in this conversation the user asked:\n" + "\n".join(reversed(lines)),
+    }
+
+
+def fit_messages(messages, budget=CHAT_TOKEN_BUDGET, summary_budget=SUMMARY_TOKEN_BUDGET):
+    """
+    The messages to send for one chat request, within a prompt token budget.
+
+    The first message (system prompt with any product context) and the
+    latest message are always kept. Earlier turns are kept newest first
+    while they fit; the rest are replaced by a short system note listing
+    the questions they asked. The stored history is not modified.
+
+    Returns (messages, stats) where stats has prompt_tokens,
+    full_tokens, saved_tokens and dropped_messages.
+    """
+    full_tokens = count_message_tokens(messages)
+    if full_tokens <= budget or len(messages) <= 2:
+        return list(messages), {
+            'prompt_tokens': full_tokens,
+            'full_tokens': full_tokens,
+            'saved_tokens': 0,
+            'dropped_messages': 0,
+        }
+
+    system, history, latest = messages[0], messages[1:-1], messages[-1]
+    used = count_message_tokens([system, latest]) + summary_budget
+    kept = []
+    for m in reversed(history):
+        cost = MESSAGE_OVERHEAD + count_tokens(m['content'])
+        if used + cost > budget:
+            break
+        kept.append(m)
+        used += cost
+    kept.reverse()
+
+    # Never start the kept history with an orphaned assistant reply
+    if kept and kept[0]['role'] == 'assistant':
+        kept = kept[1:]
+
+    dropped = history[:len(history) - len(kept)]
+    summary = _summary(dropped, summary_budget)
+    fitted = [system] + ([summary] if summary else []) + kept + [latest]
+
+    prompt_tokens = count_message_tokens(fitted)
+    return fitted, {
+        'prompt_tokens': prompt_tokens,
+        'full_tokens': full_tokens,
+        'saved_tokens': full_tokens - prompt_tokens,
+        'dropped_messages': len(dropped),
+    }
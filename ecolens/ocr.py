@@ -0,0 +1,154 @@
+"""
+OCR for product photos, off the Streamlit script thread.
+
+Images are pre-processed (grayscale, downscaled, cropped to the text
+region) and read by a local Tesseract install through pytesseract - no
+network. OcrPool runs that on a process pool behind a bounded queue;
+pages submit a photo and poll for the text.
+"""
+import hashlib
+import io
+import multiprocessing
+import os
+import threading
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+from PIL import Image, ImageOps
+
+try:
+    import pytesseract
+except ImportError:  # optional: only needed where scans are read
+    pytesseract = None
+
+# Longest side fed to Tesseract: ~300 DPI for a hand-held label photo.
+# Phone cameras deliver 3-4x that, which only slows recognition down.
+OCR_MAX_SIDE = 1600
+
+# Page segmentation "sparse text": labels are scattered words, not pages
+TESSERACT_CONFIG = "--psm 11"
+
+# Pixel-to-pixel contrast that counts as an edge, and the share of edge
+# pixels a row/column needs to be part of the text region
+EDGE_THRESHOLD = 40
+EDGE_DENSITY = 0.02
+
+
+class OcrQueueFull(RuntimeError):
+    """Every OCR slot is taken; retry the scan a bit later."""
+
+
+def image_digest(image_bytes):
+    """Content hash of an uploaded image (the OCR job id)."""
+    return hashlib.sha256(image_bytes).hexdigest()[:16]
+
+
+def text_region(pixels, margin=16):
+    """
+    (left, top, right, bottom) of the high-contrast part of a grayscale
+    image - where the printing is - or None when that is the whole image.
+    """
+    p = pixels.astype(np.int16)
+    edges = np.zeros(p.shape, dtype=bool)
+    edges[:, 1:] |= np.abs(np.diff(p, axis=1)) > EDGE_THRESHOLD
+    edges[1:, :] |= np.abs(np.diff(p, axis=0)) > EDGE_THRESHOLD
+
+    rows = np.flatnonzero(edges.mean(axis=1) > EDGE_DENSITY)
+    cols = np.flatnonzero(edges.mean(axis=0) > EDGE_DENSITY)
+    if not len(rows) or not len(cols):
+        return None
+
+    height, width = p.shape
+    box = (
+        max(0, cols[0] - margin),
+        max(0, rows[0] - margin),
+        min(width, cols[-1] + 1 + margin),
+        min(height, rows[-1] + 1 + margin),
+    )
+    if (box[2] - box[0]) * (box[3] - box[1]) > 0.9 * width * height:
+        return None
+    return box
+
+
+def preprocess(image, max_side=OCR_MAX_SIDE):
+    """Grayscale, upright, at most max_side pixels, cropped to the text."""
+    gray = ImageOps.exif_transpose(image).convert('L')
+
+    scale = max_side / max(gray.size)
+    if scale < 1:
+        gray = gray.resize((max(1, round(gray.width * scale)), max(1, round(gray.height * scale))),
+                           Image.LANCZOS)
+
+    box = text_region(np.asarray(gray))
+    return gray.crop(box) if box else gray
+
+
+def ocr_image(image):
+    """All text Tesseract reads on a product photo (PIL image)."""
+    if pytesseract is None:
+        raise RuntimeError("Scanning needs pytesseract and a local Tesseract install")
+    return pytesseract.image_to_string(preprocess(image), config=TESSERACT_CONFIG)
+
+
+def ocr_bytes(engine, image_bytes):
+    # Runs in a worker process: decode there so the page thread never does
+    return engine(Image.open(io.BytesIO(image_bytes)))
+
+
+class OcrPool:
+    """
+    Process pool for OCR with a bounded queue. Jobs are keyed by the
+    image's content hash, so re-submitting a photo that is queued or
+    recently read does not run OCR twice. Finished jobs are kept (up to
+    keep_finished) so every session polling a job can collect it.
+
+        job = pool.submit(image_bytes)   # raises OcrQueueFull when busy
+        if pool.done(job):
+            text = pool.result(job)
+    """
+
+    def __init__(self, workers=None, max_pending=8, keep_finished=64, engine=ocr_image):
+        self.engine = engine
+        self.max_pending = max_pending
+        self.keep_finished = keep_finished
+        self._executor = ProcessPoolExecutor(
+            max_workers=workers or os.cpu_count() or 1,
+            mp_context=multiprocessing.get_context('spawn'),  # never fork a threaded server
+        )
+        self._jobs = OrderedDict()
+        self._lock = threading.Lock()
+
+    def submit(self, image_bytes):
+        job_id = image_digest(image_bytes)
+        with self._lock:
+            if job_id not in self._jobs:
+                pending = sum(not future.done() for future in self._jobs.values())
+                if pending >= self.max_pending:
+                    raise OcrQueueFull(f"{pending} scans already waiting")
+                self._jobs[job_id] = self._executor.submit(ocr_bytes, self.engine, image_bytes)
+                self._forget_finished()
+        return job_id
+
+    def _forget_finished(self):
+        # Oldest finished jobs go first once more than keep_finished are held
+        finished = [job for job, future in self._jobs.items() if future.done()]
+        for job in finished[:max(0, len(finished) - self.keep_finished)]:
+            del self._jobs[job]
+
+    def done(self, job_id):
+        future = self._jobs.get(job_id)
+        return future is None or future.done()
+
+    def result(self, job_id, timeout=None):
+        """
+        OCR text of a job, waiting up to timeout. Raises KeyError for a
+        job the pool no longer holds (submit the photo again).
+        """
+        future = self._jobs.get(job_id)
+        if future is None:
+            raise KeyError(job_id)
+        return future.result(timeout)
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,106 @@
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+
+from ecolens.search import normalize
+from ecolens.tokenizer import count_tokens
+
+# Answers about a fixed catalog stay good for a while, but not forever
+RESPONSE_TTL_SECONDS = 7 * 24 * 3600
+
+
+def response_key(question, context, **params):
+    """
+    Cache key of a chatbot answer: the normalized question ("Is PET
+    recyclable?" == "is pet recyclable"), the system prompt / product
+    context and the model parameters.
+    """
+    payload = json.dumps([normalize(question), context, params], sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+def estimate_tokens(text):
+    # When the API reports no usage (Hugging Face), count locally
+    return max(1, count_tokens(text))
+
+
+class ResponseCache:
+    """
+    Persistent LLM answer cache in SQLite (WAL, so every app process can
+    share the file). Entries expire after ttl seconds; beyond
+    max_entries the least recently used are evicted. Counts hits and
+    misses, and per hit the latency and tokens the original call cost,
+    so stats() reports what the cache saved.
+    """
+
+    def __init__(self, path, ttl=RESPONSE_TTL_SECONDS, max_entries=10_000):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False, timeout=10)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        with self._db:
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS responses (key TEXT PRIMARY KEY, response TEXT, "
+                "created REAL, used REAL, latency REAL, tokens INTEGER)"
+            )
+            self._db.execute("CREATE INDEX IF NOT EXISTS responses_used ON responses (used)")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS response_stats (name TEXT PRIMARY KEY, value REAL)"
+            )
+
+    def get(self, key):
+        """Cached answer, or None (missing or expired)."""
+        now = time.time()
+        with self._lock, self._db:
+            row = self._db.execute(
+                "SELECT response, created, latency, tokens FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None or now - row[1] > self.ttl:
+                if row is not None:
+                    self._db.execute("DELETE FROM responses WHERE key = ?", (key,))
+                self._count(misses=1)
+                return None
+            self._db.execute("UPDATE responses SET used = ? WHERE key = ?", (now, key))
+            self._count(hits=1, latency_saved=row[2], tokens_saved=row[3])
+            return row[0]
+
+    def put(self, key, response, latency, tokens=None):
+        """Store an answer with what it cost (seconds, tokens; estimated if unknown)."""
+        now = time.time()
+        tokens = tokens if tokens is not None else estimate_tokens(response)
+        with self._lock, self._db:
+            self._db.execute(
+                "INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?, ?)",
+                (key, response, now, now, latency, tokens),
+            )
+            self._db.execute("DELETE FROM responses WHERE created < ?", (now - self.ttl,))
+            self._db.execute(
+                "DELETE FROM responses WHERE key IN "
+                "(SELECT key FROM responses ORDER BY used DESC LIMIT -1 OFFSET ?)",
+                (self.max_entries,),
+            )
+
+    def _count(self, **deltas):
+        self._db.executemany(
+            "INSERT INTO response_stats VALUES (?, ?) "
+            "ON CONFLICT(name) DO UPDATE SET value = value + excluded.value",
+            list(deltas.items()),
+        )
+
+    def stats(self):
+        with self._lock:
+            counters = dict(self._db.execute("SELECT name, value FROM response_stats"))
+            entries = self._db.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+        hits, misses = int(counters.get('hits', 0)), int(counters.get('misses', 0))
+        return {
+            'hits': hits,
+            'misses': misses,
+            'hit_rate': hits / (hits + misses) if hits + misses else 0.0,
+            'latency_saved_s': counters.get('latency_saved', 0.0),
+            'tokens_saved': int(counters.get('tokens_saved', 0)),
+            'entries': entries,
+        }
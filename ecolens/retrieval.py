@@ -0,0 +1,155 @@
+"""
+Local BM25 retrieval over the catalog, for grounding chatbot answers.
+
+Documents are short text records: one per product (scores, impacts,
+flags), one per category (counts, greenest and lowest-impact products,
+so comparative questions hit a single record), one per packaging
+material, and the curated GREENER_ALTERNATIVES. Only the top few
+records for a question go into the prompt.
+"""
+import numpy as np
+
+from ecolens.alternatives import GREENER_ALTERNATIVES
+from ecolens.search import normalize
+
+STOPWORDS = frozenset(
+    "a an the is are was were be been of in on at for to from and or with what which who whom how "
+    "why when does do did i my me we our you your it its this that these those than then there has "
+    "have had can could should would will tell about any some please vs versus".split()
+)
+
+# Flag columns worth saying out loud, as they read in a sentence
+FLAG_LABELS = {
+    'microplastics': "contains microplastics",
+    'silicones': "contains silicones",
+    'petroleum': "petroleum-derived ingredients",
+    'palm_oil': "contains palm oil",
+    'parabens': "contains parabens",
+    'sulfates': "contains sulfates",
+    'recyclable_packaging': "recyclable packaging",
+    'eco_certified': "eco certified",
+}
+
+
+def tokenize(text):
+    return [t for t in normalize(text).split() if t not in STOPWORDS]
+
+
+def _product_documents(summary_df):
+    flags = [c for c in FLAG_LABELS if c in summary_df.columns]
+    flag_values = summary_df[flags].to_numpy(dtype=bool) if flags else None
+    docs = []
+    for i, r in enumerate(summary_df[['name', 'category', 'eco_score', 'total_carbon_kg', 'total_water_L',
+                                      'total_energy_MJ', 'total_waste_score']].itertuples(index=False)):
+        traits = [FLAG_LABELS[f] for f, on in zip(flags, flag_values[i]) if on] if flags else []
+        docs.append(
+            f"{r.name} ({r.category}): eco score {r.eco_score}/100; carbon {r.total_carbon_kg:.3g} kg CO₂e, "
+            f"water {r.total_water_L:.3g} L, energy {r.total_energy_MJ:.3g} MJ, "
+            f"waste score {r.total_waste_score:.2g}" + (f"; {', '.join(traits)}" if traits else "")
+        )
+    return docs
+
+
+def _category_documents(summary_df):
+    docs = []
+    lowest = [
+        ('total_carbon_kg', "lowest carbon", "kg CO₂e"),
+        ('total_water_L', "lowest water use", "L"),
+        ('total_energy_MJ', "lowest energy", "MJ"),
+        ('total_waste_score', "lowest waste score", ""),
+    ]
+    for category, group in summary_df.groupby('category', sort=True):
+        ranked = group.sort_values('eco_score', ascending=False, kind='stable')
+        parts = [
+            f"{category} category: {len(group)} products, average eco score {group['eco_score'].mean():.1f}",
+            "greenest (highest eco score): " + ", ".join(
+                f"{n} {s}" for n, s in zip(ranked['name'].head(3), ranked['eco_score'].head(3))
+            ),
+            f"least green: {ranked['name'].iloc[-1]} {ranked['eco_score'].iloc[-1]}",
+        ]
+        for column, label, unit in lowest:
+            best = group.loc[group[column].idxmin()]
+            parts.append(f"{label}: {best['name']} {best[column]:.3g} {unit}".rstrip())
+        docs.append("; ".join(parts))
+    return docs
+
+
+def _material_documents(materials_df):
+    return [
+        f"{m.material} packaging material: {m.carbon_kg_per_kg} kg CO₂e, {m.water_L_per_kg} L water "
+        f"and {m.energy_MJ_per_kg} MJ energy per kg; waste score {m.waste_score} of 5"
+        for m in materials_df.itertuples(index=False)
+    ]
+
+
+def _alternative_documents(alternatives):
+    return [
+        f"Greener {category.lower()} alternative: {alt['name']}. {alt['reason']}"
+        for category, alts in alternatives.items()
+        for alt in alts
+    ]
+
+
+def catalog_documents(summary_df, materials_df=None, alternatives=GREENER_ALTERNATIVES):
+    """Every retrievable text record of a catalog."""
+    docs = _product_documents(summary_df) + _category_documents(summary_df)
+    if materials_df is not None:
+        docs += _material_documents(materials_df)
+    return docs + _alternative_documents(alternatives)
+
+
+class RetrievalIndex:
+    """
+    Okapi BM25 over short documents. Postings are flat arrays grouped by
+    term, so a query costs one slice per query term and one bincount.
+    """
+
+    def __init__(self, documents, k1=1.5, b=0.75):
+        self.documents = list(documents)
+        self.k1, self.b = k1, b
+
+        vocab, term_ids, doc_ids, lengths = {}, [], [], []
+        for doc, text in enumerate(self.documents):
+            tokens = tokenize(text)
+            lengths.append(len(tokens))
+            for token in tokens:
+                term_ids.append(vocab.setdefault(token, len(vocab)))
+                doc_ids.append(doc)
+        self.vocab = vocab
+
+        # (term, doc) pairs with their term frequency, grouped by term
+        pairs = np.array(term_ids, dtype=np.int64) * max(1, len(self.documents)) + np.array(doc_ids, dtype=np.int64)
+        pairs, tf = np.unique(pairs, return_counts=True)
+        terms = pairs // max(1, len(self.documents))
+        self.postings = (pairs % max(1, len(self.documents))).astype(np.int32)
+        self.tf = tf.astype(np.float64)
+        self.offsets = np.zeros(len(vocab) + 1, dtype=np.int64)
+        np.cumsum(np.bincount(terms, minlength=len(vocab)), out=self.offsets[1:])
+
+        self.lengths = np.array(lengths, dtype=np.float64)
+        avg = self.lengths.mean() if len(self.lengths) else 0.0
+        self.norm = k1 * (1 - b + b * self.lengths / (avg or 1.0))
+        df = np.diff(self.offsets)
+        n = len(self.documents)
+        self.idf = np.log(1 + (n - df + 0.5) / (df + 0.5))
+
+    def search(self, query, k=4):
+        """Top-k (document, score) for a query, best first."""
+        ids = sorted({self.vocab[t] for t in tokenize(query) if t in self.vocab})
+        if not ids:
+            return []
+        docs = np.concatenate([self.postings[self.offsets[t]:self.offsets[t + 1]] for t in ids])
+        tf = np.concatenate([self.tf[self.offsets[t]:self.offsets[t + 1]] for t in ids])
+        idf = np.repeat(self.idf[ids], np.diff(self.offsets)[ids])
+        weights = idf * tf * (self.k1 + 1) / (tf + self.norm[docs])
+        scores = np.bincount(docs, weights=weights, minlength=len(self.documents))
+
+        hits = np.flatnonzero(scores)
+        if len(hits) > k:
+            hits = hits[np.argpartition(-scores[hits], k)[:k]]
+        hits = hits[np.lexsort((hits, -scores[hits]))]
+        return [(self.documents[i], float(scores[i])) for i in hits]
+
+    def context(self, query, k=4):
+        """The top-k records as prompt text ('' when nothing matches)."""
+        return "\n".join(f"- {doc}" for doc, _ in self.search(query, k))
@@ -0,0 +1,218 @@
+import io
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+from PIL import Image
+
+from ecolens.extract import clean_ocr_text
+from ecolens.fuzzy import fuzzy_match_product
+from ecolens.ocr import image_digest
+
+# Differing bits (of 64) at which two photos count as the same package
+PHASH_MAX_DISTANCE = 6
+
+
+def perceptual_hash(image_bytes):
+    """
+    64-bit difference hash (dHash): brightness gradients of a 9x8
+    thumbnail. Re-takes of the same package land within a few bits.
+    """
+    image = Image.open(io.BytesIO(image_bytes))
+    image.draft('L', (64, 64))  # JPEG: decode at reduced size
+    pixels = np.asarray(image.convert('L').resize((9, 8), Image.LANCZOS), dtype=np.int16)
+    bits = (pixels[:, 1:] > pixels[:, :-1]).reshape(-1)
+    return int(np.packbits(bits).view('>u8')[0])
+
+
+def _phash(image_bytes):
+    # perceptual_hash, or None for bytes PIL cannot decode (they go to OCR and fail there)
+    try:
+        return perceptual_hash(image_bytes)
+    except (OSError, ValueError, Image.DecompressionBombError):
+        return None
+
+
+def match_scan(text, extractor, matcher):
+    """
+    Scan result for OCR text: the dict ScanCache stores (text,
+    detected_name, matched_name, confidence). A name the label gives
+    enough evidence for is taken as is, with that evidence share as its
+    confidence; otherwise the cleaned text is fuzzy-matched, so a weak
+    read comes back with a low confidence.
+    """
+    detected_name, confidence = extractor.best(text)
+    if detected_name is not None:
+        matched_name = detected_name
+    else:
+        detected_name = clean_ocr_text(text)[:64]
+        matched_name, confidence = fuzzy_match_product(detected_name, None, matcher=matcher)
+    return {
+        'text': text,
+        'detected_name': detected_name,
+        'matched_name': matched_name,
+        'confidence': confidence,
+    }
+
+
+def _nearest(phashes, phash, max_distance):
+    # Index of the closest hash within max_distance bits, or None
+    if not len(phashes):
+        return None
+    # Popcount of the XOR via unpackbits (np.bitwise_count needs NumPy 2)
+    diff = np.ascontiguousarray(phashes ^ np.uint64(phash), dtype=np.uint64)
+    distances = np.unpackbits(diff.view(np.uint8)).reshape(-1, 64).sum(axis=1)
+    best = int(np.argmin(distances))
+    return best if distances[best] <= max_distance else None
+
+
+class ScanCache:
+    """
+    Scan results (OCR text, extracted name, matched product, confidence)
+    by photo, for one catalog version. Looked up by exact content hash,
+    then by perceptual hash so a near-identical re-take skips OCR too.
+
+    Two tiers: an in-memory LRU of max_entries and, with a path, an
+    SQLite file holding up to max_disk_entries (least recently used
+    evicted). Disk rows from other catalog versions are dropped on open,
+    since their matches may no longer hold.
+    """
+
+    def __init__(self, version, path=None, max_entries=512, max_disk_entries=20_000,
+                 max_distance=PHASH_MAX_DISTANCE):
+        self.version = version
+        self.max_entries = max_entries
+        self.max_disk_entries = max_disk_entries
+        self.max_distance = max_distance
+        self._memory = OrderedDict()  # digest -> (phash, result)
+        self._lock = threading.Lock()
+        self.hits = self.near_hits = self.misses = 0
+
+        self._db = None
+        self._disk_index = {}  # digest -> phash of every disk row
+        self._disk_arrays = None  # (digests, phashes) for near lookups, rebuilt after writes
+        if path:
+            self._db = sqlite3.connect(path, check_same_thread=False)
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS scans (digest TEXT PRIMARY KEY, version TEXT, "
+                "phash INTEGER, result TEXT, used REAL)"
+            )
+            with self._db:
+                self._db.execute("DELETE FROM scans WHERE version != ?", (version,))
+            # SQLite integers are signed; hashes are stored as int64 bit patterns
+            self._disk_index = {
+                digest: int(np.int64(phash).view(np.uint64))
+                for digest, phash in self._db.execute("SELECT digest, phash FROM scans")
+            }
+
+    def get(self, image_bytes):
+        """Cached result dict for a photo (or a near-duplicate of it), else None."""
+        digest = image_digest(image_bytes)
+        with self._lock:
+            result = self._get_exact(digest)
+            if result is not None:
+                self.hits += 1
+                return result
+
+        phash = _phash(image_bytes)
+        with self._lock:
+            # A featureless photo (blank, dark) hashes to 0 and looks like every other one;
+            # None: not a readable image
+            result = self._get_near(phash) if phash else None
+            if result is None:
+                self.misses += 1
+                return None
+            self.near_hits += 1
+            self._remember(digest, phash, result)
+            return result
+
+    def put(self, image_bytes, result):
+        """Cache a photo's result (skipped for bytes that are not a readable image)."""
+        digest, phash = image_digest(image_bytes), _phash(image_bytes)
+        if phash is None:
+            return
+        with self._lock:
+            self._remember(digest, phash, result)
+            if self._db is not None:
+                self._store(digest, phash, result)
+
+    # ---------------------------------------------------------------
+
+    def _remember(self, digest, phash, result):
+        self._memory[digest] = (phash, result)
+        self._memory.move_to_end(digest)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+
+    def _get_exact(self, digest):
+        if digest in self._memory:
+            self._memory.move_to_end(digest)
+            return self._memory[digest][1]
+        if self._db is None:
+            return None
+        row = self._db.execute("SELECT phash, result FROM scans WHERE digest = ?", (digest,)).fetchone()
+        if row is None:
+            return None
+        result = json.loads(row[1])
+        self._touch(digest)
+        self._remember(digest, int(np.int64(row[0]).view(np.uint64)), result)
+        return result
+
+    def _get_near(self, phash):
+        keys = list(self._memory)
+        phashes = np.fromiter((self._memory[k][0] for k in keys), dtype=np.uint64, count=len(keys))
+        i = _nearest(phashes, phash, self.max_distance)
+        if i is not None:
+            self._memory.move_to_end(keys[i])
+            return self._memory[keys[i]][1]
+
+        if not self._disk_index:
+            return None
+        if self._disk_arrays is None:
+            digests = list(self._disk_index)
+            self._disk_arrays = (digests, np.fromiter(self._disk_index.values(), dtype=np.uint64))
+        digests, phashes = self._disk_arrays
+        i = _nearest(phashes, phash, self.max_distance)
+        if i is None:
+            return None
+        row = self._db.execute("SELECT result FROM scans WHERE digest = ?", (digests[i],)).fetchone()
+        if row is None:
+            # Evicted, or deleted by another process since the arrays were built
+            self._disk_index.pop(digests[i], None)
+            self._disk_arrays = None
+            return None
+        self._touch(digests[i])
+        return json.loads(row[0])
+
+    def _touch(self, digest):
+        with self._db:
+            self._db.execute("UPDATE scans SET used = ? WHERE digest = ?", (time.time(), digest))
+
+    def _store(self, digest, phash, result):
+        signed = int(np.uint64(phash).view(np.int64))
+        with self._db:
+            self._db.execute(
+                "INSERT OR REPLACE INTO scans VALUES (?, ?, ?, ?, ?)",
+                (digest, self.version, signed, json.dumps(result), time.time()),
+            )
+            evicted = self._db.execute(
+                "SELECT digest FROM scans ORDER BY used DESC LIMIT -1 OFFSET ?", (self.max_disk_entries,)
+            ).fetchall()
+            self._db.executemany("DELETE FROM scans WHERE digest = ?", evicted)
+
+        self._disk_index[digest] = phash
+        for (old,) in evicted:
+            self._disk_index.pop(old, None)
+        self._disk_arrays = None
+
+    def stats(self):
+        return {
+            'hits': self.hits,
+            'near_hits': self.near_hits,
+            'misses': self.misses,
+            'memory_entries': len(self._memory),
+            'disk_entries': len(self._disk_index),
+        }
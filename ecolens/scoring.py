@@ -0,0 +1,148 @@
+from dataclasses import asdict, dataclass
+
+import pandas as pd
+
+from ecolens.impact import IMPACT_COLUMNS, compute_impact
+from ecolens.lookup import product_ids
+
+# 0/1 ingredient and packaging flags read from product.csv (missing -> 0)
+FLAG_COLUMNS = (
+    "microplastics",
+    "silicones",
+    "petroleum",
+    "palm_oil",
+    "parabens",
+    "sulfates",
+    "recyclable_packaging",
+    "eco_certified",
+)
+
+SUMMARY_COLUMNS = [
+    'product_id',
+    'name',
+    'category',
+    *IMPACT_COLUMNS,
+    'packaging_score',
+    'ingredient_score',
+    'bonus_score',
+    'eco_score',
+]
+
+
+@dataclass(frozen=True)
+class ScoringConfig:
+    """
+    Every constant the EcoScore depends on besides the two CSVs.
+    The default is packaging-only scoring; set the shares to blend in
+    the ingredient and bonus sub-scores.
+    """
+    # Normalization caps (fixed)
+    carbon_cap: float = 0.5    # kg CO₂e
+    water_cap: float = 10.0    # liters
+    energy_cap: float = 20.0   # MJ
+    waste_cap: float = 5.0     # max material waste score
+
+    # Packaging score weights
+    carbon_weight: float = 0.35
+    water_weight: float = 0.25
+    energy_weight: float = 0.25
+    waste_weight: float = 0.15
+
+    # Final EcoScore breakup
+    packaging_share: float = 1.0
+    ingredient_share: float = 0.0
+    bonus_share: float = 0.0
+
+    # Ingredient penalties and bonus points, (flag, points)
+    ingredient_penalties: tuple = (
+        ("microplastics", 30),
+        ("palm_oil", 20),
+        ("parabens", 10),
+        ("sulfates", 10),
+    )
+    bonus_base: float = 60
+    bonus_points: tuple = (
+        ("recyclable_packaging", 20),
+        ("eco_certified", 20),
+    )
+
+    def as_dict(self):
+        return asdict(self)
+
+
+DEFAULT_CONFIG = ScoringConfig()
+
+
+def score_catalog(products, materials, config=DEFAULT_CONFIG):
+    """
+    Score every product in one vectorized pass.
+    Takes the raw product.csv / material.csv frames and returns the
+    summary table (impact totals, sub-scores, eco_score, flags).
+    Pure function: no Streamlit, no globals, inputs are not modified.
+    """
+    products_df = products.copy()
+
+    if 'product_id' not in products_df.columns:
+        products_df['product_id'] = product_ids(products_df['name'])
+
+    for c in FLAG_COLUMNS:
+        if c not in products_df.columns:
+            products_df[c] = 0
+
+    # Make sure flags are 0/1 ints (handles blanks/NaN)
+    products_df[list(FLAG_COLUMNS)] = products_df[list(FLAG_COLUMNS)].fillna(0).astype(int)
+
+    # =============================
+    # COMPUTE ENVIRONMENTAL IMPACT
+    # =============================
+    products_df[IMPACT_COLUMNS] = compute_impact(products_df, materials)
+
+    # =============================
+    # NORMALIZATION
+    # =============================
+    carbon_norm = (products_df['total_carbon_kg'] / config.carbon_cap).clip(0, 1)
+    water_norm = (products_df['total_water_L'] / config.water_cap).clip(0, 1)
+    energy_norm = (products_df['total_energy_MJ'] / config.energy_cap).clip(0, 1)
+    waste_norm = (products_df['total_waste_score'] / config.waste_cap).clip(0, 1)
+
+    # =============================
+    # PACKAGING SCORE (0–100)
+    # =============================
+    products_df['packaging_score'] = ((
+        (1 - carbon_norm) * config.carbon_weight +
+        (1 - water_norm) * config.water_weight +
+        (1 - energy_norm) * config.energy_weight +
+        (1 - waste_norm) * config.waste_weight
+    ) * 100).round(1)
+
+    # =============================
+    # INGREDIENT SCORE (0–100) using 0/1 flags
+    # =============================
+    penalty = 0
+    for flag, points in config.ingredient_penalties:
+        penalty = penalty + points * products_df[flag]
+    products_df['ingredient_score'] = (100 - penalty).clip(0, 100).round(1)
+
+    # =============================
+    # BONUS SCORE (0–100)
+    # =============================
+    bonus = config.bonus_base
+    for flag, points in config.bonus_points:
+        bonus = bonus + points * products_df[flag]
+    products_df['bonus_score'] = pd.Series(bonus, index=products_df.index).clip(0, 100).round(1)
+
+    # =============================
+    # FINAL ECOSCORE (0–100)
+    # =============================
+    products_df['eco_score'] = (
+        config.packaging_share * products_df['packaging_score'] +
+        config.ingredient_share * products_df['ingredient_score'] +
+        config.bonus_share * products_df['bonus_score']
+    ).round(1)
+
+    return products_df[SUMMARY_COLUMNS + list(FLAG_COLUMNS)].reset_index(drop=True)
+
+
+def load_catalog(product_csv, material_csv, config=DEFAULT_CONFIG):
+    """Read both CSVs and score them (for batch jobs and services)."""
+    return score_catalog(pd.read_csv(product_csv), pd.read_csv(material_csv), config)
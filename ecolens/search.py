@@ -0,0 +1,193 @@
+import re
+
+import numpy as np
+import pandas as pd
+
+_NON_ALNUM = re.compile(r"[^0-9a-z]+")
+
+# Trigrams are taken from the first MAX_GRAM_CHARS characters of a name
+MAX_GRAM_CHARS = 64
+
+
+def normalize(text):
+    """Lowercase, punctuation -> spaces, collapsed whitespace."""
+    if not isinstance(text, str):
+        return ""
+    return " ".join(_NON_ALNUM.sub(" ", text.lower()).split())
+
+
+def normalize_all(values):
+    """normalize() over a whole column at once."""
+    text = pd.Series(values, dtype=object).where(lambda v: v.map(type) == str, '')
+    return text.str.lower().str.replace(_NON_ALNUM.pattern, ' ', regex=True).str.strip().tolist()
+
+
+def product_brands(summary_df):
+    """
+    Brand per product: the 'brand' column when the catalog has one, else
+    the part of the name before its category ("Soap & Glory Body Wash
+    300ml" -> "Soap & Glory"), else the first word.
+    """
+    if 'brand' in summary_df.columns:
+        return summary_df['brand'].fillna('').astype(str).tolist()
+
+    brands = []
+    for name, category in zip(summary_df['name'], summary_df['category']):
+        name = name if isinstance(name, str) else ''
+        cut = name.lower().find(category.lower()) if isinstance(category, str) and category else -1
+        brands.append(name[:cut].strip() if cut > 0 else name.split(' ', 1)[0])
+    return brands
+
+
+def _csr(term_of_pair, row_of_pair, n_terms):
+    # Postings grouped by term, rows ascending inside each term
+    order = np.lexsort((row_of_pair, term_of_pair))
+    postings = row_of_pair[order].astype(np.int32)
+    offsets = np.zeros(n_terms + 1, dtype=np.int64)
+    np.cumsum(np.bincount(term_of_pair, minlength=n_terms), out=offsets[1:])
+    return offsets, postings
+
+
+def _gram_codes(texts):
+    """
+    Padded character trigrams of every text as int64 codes, vectorized.
+    Returns (codes, rows) for each (text, trigram) occurrence.
+    """
+    padded = np.array([f"  {t[:MAX_GRAM_CHARS]} " for t in texts], dtype=f"<U{MAX_GRAM_CHARS + 3}")
+    chars = padded.view(np.uint32).reshape(len(texts), -1).astype(np.int64)
+    lengths = np.char.str_len(padded)
+
+    codes = (chars[:, :-2] << 42) | (chars[:, 1:-1] << 21) | chars[:, 2:]
+    valid = np.arange(codes.shape[1])[None, :] < (lengths - 2)[:, None]
+    rows = np.broadcast_to(np.arange(len(texts))[:, None], codes.shape)
+    return codes[valid], rows[valid]
+
+
+class ProductSearchIndex:
+    """
+    Server-side search over product names and brands, built once per
+    catalog version.
+
+    - prefix index: every name/brand token in a sorted vocabulary with
+      CSR postings, so all tokens starting with a typed prefix are one
+      binary search and one contiguous postings slice (a flattened trie)
+    - trigram postings: typo- and infix-tolerant fallback when the
+      prefix match finds fewer than k products
+
+    search() returns the top-k names without touching the rest of the
+    catalog, so the page never sorts or ships the full option list.
+    """
+
+    def __init__(self, summary_df):
+        self.names = summary_df['name'].to_numpy(dtype=object)
+        texts = normalize_all(self.names)
+        brands = normalize_all(product_brands(summary_df))
+        self.name_len = np.array([len(t) for t in texts], dtype=np.int64)
+        self.n = len(texts)
+
+        # ---------- token prefix index ----------
+        token_rows, tokens = [], []
+        first_tokens = []
+        for row, (text, brand) in enumerate(zip(texts, brands)):
+            words = text.split()
+            first_tokens.append(words[0] if words else '')
+            for tok in set(words) | set(brand.split()):
+                tokens.append(tok)
+                token_rows.append(row)
+
+        self.vocab = np.array(sorted(set(tokens)), dtype=object)
+        term_id = {tok: i for i, tok in enumerate(self.vocab)}
+        term_of_pair = np.array([term_id[t] for t in tokens], dtype=np.int64)
+        self.token_offsets, self.token_postings = _csr(
+            term_of_pair, np.array(token_rows, dtype=np.int64), len(self.vocab)
+        )
+        self.first_term = np.array([term_id.get(t, -1) for t in first_tokens], dtype=np.int64)
+
+        # ---------- trigram postings ----------
+        codes, rows = _gram_codes(texts)
+        order = np.lexsort((rows, codes))
+        codes, rows = codes[order], rows[order]
+        first = np.ones(len(codes), dtype=bool)  # a name repeating a trigram counts once
+        first[1:] = (codes[1:] != codes[:-1]) | (rows[1:] != rows[:-1])
+        self.gram_codes, gram_of_pair = np.unique(codes[first], return_inverse=True)
+        self.gram_offsets, self.gram_postings = _csr(gram_of_pair.reshape(-1), rows[first], len(self.gram_codes))
+
+    # ---------------------------------------------------------------
+
+    def _prefix_range(self, prefix):
+        lo = np.searchsorted(self.vocab, prefix, side='left')
+        hi = np.searchsorted(self.vocab, prefix + '\x7f', side='left')  # tokens are [0-9a-z]
+        return lo, hi
+
+    def _prefix_mask(self, prefix):
+        # One contiguous postings slice covers every token with this prefix
+        lo, hi = self._prefix_range(prefix)
+        mask = np.zeros(self.n, dtype=bool)
+        mask[self.token_postings[self.token_offsets[lo]:self.token_offsets[hi]]] = True
+        return mask
+
+    def _top(self, rows, key, k):
+        # Smallest keys first; ties broken by row so results are stable
+        key = key * (self.n + 1) + rows
+        if len(rows) > k:
+            part = np.argpartition(key, k)[:k]
+            rows, key = rows[part], key[part]
+        return rows[np.argsort(key, kind='stable')]
+
+    def prefix_search(self, query, k=10):
+        """Rows whose tokens start with every query word (last word may be partial)."""
+        words = normalize(query).split()
+        if not words:
+            return np.empty(0, dtype=np.int32)
+
+        mask = self._prefix_mask(words[0])
+        for word in words[1:]:
+            mask &= self._prefix_mask(word)
+        rows = np.flatnonzero(mask)
+
+        # Names starting with the first word first, then shorter names
+        lo, hi = self._prefix_range(words[0])
+        first = self.first_term[rows]
+        starts = (first >= lo) & (first < hi)
+        key = (~starts).astype(np.int64) * 1024 + np.minimum(self.name_len[rows], 1023)
+        return self._top(rows, key, k)
+
+    def trigram_search(self, query, k=10, min_overlap=0.5):
+        """Rows sharing at least min_overlap of the query's trigrams, best overlap first."""
+        text = normalize(query)
+        if not text:
+            return np.empty(0, dtype=np.int32)
+
+        codes, _ = _gram_codes([text])
+        codes = np.unique(codes)
+        ids = np.searchsorted(self.gram_codes, codes)
+        ids = ids[(ids < len(self.gram_codes)) & (self.gram_codes[np.minimum(ids, len(self.gram_codes) - 1)] == codes)]
+        if not len(ids):
+            return np.empty(0, dtype=np.int32)
+
+        hits = np.concatenate([self.gram_postings[self.gram_offsets[i]:self.gram_offsets[i + 1]] for i in ids])
+        counts = np.bincount(hits, minlength=self.n)
+        rows = np.flatnonzero(counts >= max(1, int(np.ceil(min_overlap * len(codes)))))
+        key = (len(codes) - counts[rows]).astype(np.int64) * 1024 + np.minimum(self.name_len[rows], 1023)
+        return self._top(rows, key, k)
+
+    def search_rows(self, query, k=10):
+        rows = self.prefix_search(query, k)
+        if len(rows) < k:
+            extra = self.trigram_search(query, k)
+            rows = np.concatenate([rows, extra[~np.isin(extra, rows)]])[:k]
+        return rows
+
+    def search(self, query, k=10):
+        """Top-k product names for what the user has typed so far."""
+        return [self.names[row] for row in self.search_rows(query, k)]
+
+    def suggestions(self, query, k=10, keep=None):
+        """
+        Selectbox options for a query: the top-k matches (the first k
+        products when nothing is typed yet), with `keep` - the product
+        already selected - always first so the selection survives.
+        """
+        names = self.search(query, k) if normalize(query) else list(self.names[:k])
+        names = [name for name in names if isinstance(name, str) and name != keep]
+        return ([keep] if keep else []) + names
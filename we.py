@@ -2,63 +2,33 @@
 
 import streamlit as st
 import pandas as pd
-import numpy as np
 import streamlit.components.v1 as components
-import requests
-def get_greener_alternatives(current_product_name, summary_df, max_alternatives=5):
-    """
-    Find greener alternatives from the actual product database.
-    Returns products in the same category with better eco scores.
-    """
-    # Get current product details
-    current = summary_df[summary_df['name'] == current_product_name]
-    if current.empty:
-        return []
-    
-    current_row = current.iloc[0]
-    current_category = current_row['category']
-    current_score = current_row['eco_score']
-    
-    # Find alternatives: same category, better score, exclude current product
-    alternatives = summary_df[
-        (summary_df['category'] == current_category) &
-        (summary_df['eco_score'] > current_score) &
-        (summary_df['name'] != current_product_name)
-    ].copy()
-    
-    # Sort by eco score (best first)
-    alternatives = alternatives.sort_values('eco_score', ascending=False)
-    
-    # Take top N
-    alternatives = alternatives.head(max_alternatives)
-    
-    # Calculate improvement metrics for each alternative
-    results = []
-    for _, alt in alternatives.iterrows():
-        carbon_reduction = ((current_row['total_carbon_kg'] - alt['total_carbon_kg']) / current_row['total_carbon_kg'] * 100) if current_row['total_carbon_kg'] > 0 else 0
-        water_reduction = ((current_row['total_water_L'] - alt['total_water_L']) / current_row['total_water_L'] * 100) if current_row['total_water_L'] > 0 else 0
-        energy_reduction = ((current_row['total_energy_MJ'] - alt['total_energy_MJ']) / current_row['total_energy_MJ'] * 100) if current_row['total_energy_MJ'] > 0 else 0
-        
-        # Find the biggest improvement
-        improvements = []
-        if carbon_reduction > 5:
-            improvements.append(f"{carbon_reduction:.0f}% less carbon")
-        if water_reduction > 5:
-            improvements.append(f"{water_reduction:.0f}% less water")
-        if energy_reduction > 5:
-            improvements.append(f"{energy_reduction:.0f}% less energy")
-        
-        if not improvements:
-            improvements.append("Better overall eco score")
-        
-        results.append({
-            'name': alt['name'],
-            'eco_score': alt['eco_score'],
-            'improvement': improvements[0],  # Show the best improvement
-            'score_diff': alt['eco_score'] - current_score
-        })
-    
-    return results
+import os
+import time
+
+from ecolens import (
+    CHART_WIDTH_PX,
+    HFClient,
+    HFError,
+    ModelLoading,
+    PAGE_ROWS,
+    ScoringConfig,
+    TREND_RANGES,
+    catalog_version,
+    lttb,
+    response_key,
+)
+from app_common import (
+    MATERIAL_CSV,
+    PRODUCT_CSV,
+    current_user,
+    load_history_store,
+    load_response_cache,
+    load_scored_catalog,
+    log_purchases,
+    session_history,
+)
+
 st.set_page_config(page_title="EcoLens", page_icon="🌱", layout="wide")
 st.markdown("""
 <style>
@@ -76,228 +46,26 @@ st.markdown("""
 </style>
 """, unsafe_allow_html=True)
 
-GREENER_ALTERNATIVES = {
-    "Cream": [
-        {
-            "name": "Minimalist Marula Oil Moisturizer",
-            "reason": "Uses an aluminum tube instead of a plastic jar, reducing total plastic waste."
-        },
-        {
-            "name": "Earth Rhythm Phyto Clear Moisturizer",
-            "reason": "Packaged in a reusable glass jar with lower waste impact than PET."
-        },
-        {
-            "name": "Plum Green Tea Moisturizer",
-            "reason": "Smaller packaging size means less total material used."
-        }
-    ],
-    "Body Wash": [
-        {
-            "name": "Ethique Solid Body Wash Bar",
-            "reason": "Eliminates plastic bottles entirely by using a solid bar format."
-        },
-        {
-            "name": "Earth Rhythm Body Wash Bar",
-            "reason": "Zero plastic packaging results in near-zero packaging emissions."
-        }
-    ],
-    "Sunscreen": [
-        {
-            "name": "Raw Beauty Wellness Sunscreen Stick",
-            "reason": "Paper-based packaging avoids high-energy aluminum and plastic bottles."
-        },
-        {
-            "name": "Dot & Key Sunscreen Stick",
-            "reason": "Compact solid format reduces packaging weight significantly."
-        },
-        {
-            "name": "Minimalist SPF 50 (50g)",
-            "reason": "Smaller tube uses far less material than large sunscreen bottles."
-        }
-    ],
-    "Shampoo": [
-        {
-            "name": "Ethique Shampoo Bar",
-            "reason": "Solid shampoo bar completely removes the need for plastic bottles."
-        },
-        {
-            "name": "Earth Rhythm Shampoo Bar",
-            "reason": "Lower water and carbon footprint due to zero liquid packaging."
-        },
-        {
-            "name": "Bare Anatomy Concentrated Shampoo",
-            "reason": "Concentrated formula requires a smaller bottle."
-        }
-    ]
-}
-
-
-# -----------------------------
-# Step 0: Define file paths
-# -----------------------------
-PRODUCT_CSV = "product.csv"
-MATERIAL_CSV = "material.csv"
-
 # -----------------------------
-# Step 1: Read CSV files
+# Step 1: Score the catalog (shared ecolens engine)
 # -----------------------------
-products_df = pd.read_csv(PRODUCT_CSV)
-materials_df = pd.read_csv(MATERIAL_CSV)
-
-NEW_FLAG_COLS = [
-    "microplastics",
-    "palm_oil",
-    "parabens",
-    "sulfates",
-    "recyclable_packaging",
-    "eco_certified",
-]
-
-for c in NEW_FLAG_COLS:
-    if c not in products_df.columns:
-        products_df[c] = 0
-
-# Make sure flags are 0/1 ints (handles blanks/NaN)
-products_df[NEW_FLAG_COLS] = products_df[NEW_FLAG_COLS].fillna(0).astype(int)
-
-# Convert material impact dataframe to dictionary
-material_impact_dict = {}
-for _, row in materials_df.iterrows():
-    material_impact_dict[row['material']] = {
-        'carbon': row['carbon_kg_per_kg'],
-        'water': row['water_L_per_kg'],
-        'energy': row['energy_MJ_per_kg'],
-        'waste': row['waste_score']
-    }
-
-# =============================
-# MATERIAL IMPACT DICTIONARY
-# =============================
-material_impact_dict = {}
-for _, row in materials_df.iterrows():
-    material_impact_dict[row['material']] = {
-        'carbon': row['carbon_kg_per_kg'],
-        'water': row['water_L_per_kg'],
-        'energy': row['energy_MJ_per_kg'],
-        'waste': row['waste_score']  # 1–5 (higher = worse)
-    }
-
-# =============================
-# INITIALIZE RESULT COLUMNS
-# =============================
-products_df['total_carbon_kg'] = 0.0
-products_df['total_water_L'] = 0.0
-products_df['total_energy_MJ'] = 0.0
-products_df['total_waste_score'] = 0.0
-
-# =============================
-# COMPUTE ENVIRONMENTAL IMPACT
-# =============================
-for i, product in products_df.iterrows():
-    total_carbon = 0.0
-    total_water = 0.0
-    total_energy = 0.0
-    waste_scores = []
-
-    for j in range(1, 4):
-        material = product.get(f'material_{j}')
-        weight_g = product.get(f'weight_{j}_g')
-
-        if pd.isna(material) or pd.isna(weight_g):
-            continue
-
-        impact = material_impact_dict.get(material)
-        if not impact:
-            continue
-
-        weight_kg = weight_g / 1000
-
-        total_carbon += weight_kg * impact['carbon']
-        total_water += weight_kg * impact['water']
-        total_energy += weight_kg * impact['energy']
-
-        # Waste is a material-type penalty (not mass-scaled)
-        waste_scores.append(impact['waste'])
-
-    products_df.at[i, 'total_carbon_kg'] = total_carbon
-    products_df.at[i, 'total_water_L'] = total_water
-    products_df.at[i, 'total_energy_MJ'] = total_energy
-    products_df.at[i, 'total_waste_score'] = np.mean(waste_scores) if waste_scores else 0
-
-# =============================
-# NORMALIZATION CAPS (FIXED)
-# =============================
-CARBON_CAP = 0.5   # kg CO₂e
-WATER_CAP = 10.0   # liters
-ENERGY_CAP = 20.0  # MJ
-WASTE_CAP = 5.0    # max material waste score
-
-products_df['carbon_norm'] = (products_df['total_carbon_kg'] / CARBON_CAP).clip(0, 1)
-products_df['water_norm'] = (products_df['total_water_L'] / WATER_CAP).clip(0, 1)
-products_df['energy_norm'] = (products_df['total_energy_MJ'] / ENERGY_CAP).clip(0, 1)
-products_df['waste_norm'] = (products_df['total_waste_score'] / WASTE_CAP).clip(0, 1)
-
-# =============================
-# PACKAGING ECOSCORE (0–100)
-# =============================
-products_df['packaging_score'] = (
-    (1 - products_df['carbon_norm']) * 0.35 +
-    (1 - products_df['water_norm']) * 0.25 +
-    (1 - products_df['energy_norm']) * 0.25 +
-    (1 - products_df['waste_norm']) * 0.15
-) * 100
-
-products_df['packaging_score'] = products_df['packaging_score'].round(1)
-
-# =============================
-# INGREDIENT SCORE (0–100) using 0/1 flags
-# =============================
-# penalties (tweak anytime; these are hackathon-friendly)
-products_df['ingredient_score'] = 100 - (
-    30 * products_df['microplastics'] +
-    20 * products_df['palm_oil'] +
-    10 * products_df['parabens'] +
-    10 * products_df['sulfates']
+SCORING_CONFIG = ScoringConfig(
+    # Breakup: 50% packaging, 40% ingredients, 10% bonus
+    packaging_share=0.50,
+    ingredient_share=0.40,
+    bonus_share=0.10,
 )
 
-products_df['ingredient_score'] = products_df['ingredient_score'].clip(0, 100).round(1)
+catalog = load_scored_catalog(catalog_version(PRODUCT_CSV, MATERIAL_CSV, SCORING_CONFIG), SCORING_CONFIG)
 
-# =============================
-# BONUS SCORE (0–100)
-# - small trust/circularity boost
-# =============================
-# simple: if recyclable or certified -> better bonus
-products_df['bonus_score'] = 60 + (
-    20 * products_df['recyclable_packaging'] +
-    20 * products_df['eco_certified']
-)
-products_df['bonus_score'] = products_df['bonus_score'].clip(0, 100).round(1)
-
-# =============================
-# FINAL ECOSCORE (0–100)
-# Breakup: 50% packaging, 40% ingredients, 10% bonus
-# =============================
-products_df['eco_score'] = (
-    0.50 * products_df['packaging_score'] +
-    0.40 * products_df['ingredient_score'] +
-    0.10 * products_df['bonus_score']
-).round(1)
-
-# =============================
-# FINAL SUMMARY TABLE (REQUIRED FOR GREEN SCORE PAGE)
-# =============================
-summary_df = products_df[[
-    'name',
-    'category',
-    'total_carbon_kg',
-    'total_water_L',
-    'total_energy_MJ',
-    'total_waste_score',
-    'packaging_score',
-    'ingredient_score',
-    'bonus_score',
-    'eco_score'
-]].copy()
+
+@st.cache_resource(show_spinner=False)
+def load_hf_client(api_url, token):
+    """
+    One Hugging Face client per process: keep-alive connection pool,
+    timeouts, retries and a circuit breaker shared by every session.
+    """
+    return HFClient(api_url, token)
 
 
 # -------------------------
@@ -533,14 +301,7 @@ elif st.session_state.page == "GreenScore":
     st.button("← Back to Home", on_click=go, args=("Home",))
     st.title("🌿 GreenScore")    
     # Check if user clicked an alternative product
-    if "impact_history" not in st.session_state:
-        st.session_state.impact_history = pd.DataFrame(columns=[
-            "Product", "Category", "Eco Score",
-            "Carbon (kg)", "Water (L)", "Energy (MJ)", "Waste Score"
-        ])
-
-    if "logged_keys" not in st.session_state:
-        st.session_state.logged_keys = set()
+    session_history()  # this user's stored purchases and logged_keys
     if 'selected_alternative' in st.session_state:
         product_input = st.session_state['selected_alternative']
         del st.session_state['selected_alternative']  # Clear it after using
@@ -550,20 +311,23 @@ elif st.session_state.page == "GreenScore":
     # -----------------------------
     # Step 7: USER INPUT + DISPLAY
     # -----------------------------
-#If coming from alternative click, pre-select i
-    if product_input:
-        default_index = list(sorted(summary_df['name'].unique())).index(product_input)
-    else:
-        default_index = None
-    
+#If coming from alternative click, pre-select it; otherwise keep the current product
+    product_input = product_input or st.session_state.get("selected_product")
+    if product_input not in catalog.products:
+        product_input = None
+
+    # Search runs server-side: only the top matches reach the selectbox
+    query = st.text_input("🔍 Search for a product", placeholder="Start typing to search...")
+    product_options = catalog.search.suggestions(query, k=20, keep=product_input)
+
     product_input = st.selectbox(
-        "🔍 Search for a product",
-        options=sorted(summary_df['name'].unique()),
-        index=default_index,
-        placeholder="Start typing to search..."
+        "Matching products",
+        options=product_options,
+        index=0 if product_input else None,
+        placeholder="Pick a product..."
     )
     if product_input:
-        result = summary_df[summary_df['name'] == product_input]
+        result = catalog.products.frame(product_input)
         st.session_state.selected_product = product_input
     
         if result.empty:
@@ -573,15 +337,7 @@ elif st.session_state.page == "GreenScore":
             log_key = f"{product_input}_{r['eco_score']}"
 
             if log_key not in st.session_state.logged_keys:
-                st.session_state.impact_history.loc[len(st.session_state.impact_history)] = {
-                    "Product": product_input,
-                    "Category": r["category"],
-                    "Eco Score": r["eco_score"],
-                    "Carbon (kg)": r["total_carbon_kg"],
-                    "Water (L)": r["total_water_L"],
-                    "Energy (MJ)": r["total_energy_MJ"],
-                    "Waste Score": r["total_waste_score"]
-                }
+                log_purchases(r)
                 st.session_state.logged_keys.add(log_key)
     
             st.divider()
@@ -750,7 +506,7 @@ elif st.session_state.page == "GreenScore":
             st.subheader("🌿 Greener Alternatives")
             st.caption("Click any product to view its full eco score")
             
-            alternatives = get_greener_alternatives(product_input, summary_df, max_alternatives=5)
+            alternatives = catalog.alternatives_table.for_product(product_input, max_alternatives=5)
             
             if alternatives:
                 for alt in alternatives:
@@ -803,28 +559,47 @@ elif st.session_state.page == "Chatbot":
     st.title("🤖 AI Chatbot")
     st.write("Ask a question about sustainability, ingredients, and alternatives.")
 
-    API_URL = "https://api-inference.huggingface.co/models/mistralai/Mistral-7B-Instruct-v0.2"
-    HEADERS = {
-        "Authorization": f"Bearer {st.secrets['HF_API_KEY']}"
-    }
+    # HF_API_URL points the page at another endpoint (e.g. a local stand-in)
+    API_URL = os.environ.get(
+        "HF_API_URL", "https://api-inference.huggingface.co/models/mistralai/Mistral-7B-Instruct-v0.2"
+    )
+    hf_client = load_hf_client(API_URL, st.secrets['HF_API_KEY'])
 
     if "chat_history" not in st.session_state:
         st.session_state.chat_history = []
 
     user_q = st.text_input("Your question")
 
+    response_cache = load_response_cache()
+
     if st.button("Ask") and user_q.strip():
-        with st.spinner("Thinking..."):
-            response = requests.post(
-                API_URL,
-                headers=HEADERS,
-                json={"inputs": f"Answer clearly:\n{user_q}"}
-            )
-
-            if response.status_code == 200:
-                ai_reply = response.json()[0]["generated_text"]
+        # Lookup questions are answered from the catalog, no model call
+        ai_reply = catalog.intents.answer(user_q)
+        if ai_reply is None:
+            # Ground the answer in the few catalog records relevant to the question
+            catalog_context = catalog.retrieval.context(user_q, k=4)
+            if catalog_context:
+                prompt = (
+                    "Answer clearly, using this EcoLens catalog data where it is relevant:\n"
+                    f"{catalog_context}\n\nQuestion: {user_q}"
+                )
             else:
-                ai_reply = "⚠️ AI service unavailable. Try again."
+                prompt = f"Answer clearly:\n{user_q}"
+
+            # Repeat questions are answered from the cache, no model call
+            cache_key = response_key(user_q, catalog_context or "Answer clearly:", model=API_URL)
+            ai_reply = response_cache.get(cache_key)
+
+            if ai_reply is None:
+                with st.spinner("Thinking..."):
+                    started = time.perf_counter()
+                    try:
+                        ai_reply = hf_client.generate(prompt)
+                        response_cache.put(cache_key, ai_reply, time.perf_counter() - started)
+                    except ModelLoading as e:
+                        ai_reply = f"⏳ The AI model is warming up (ready in ~{e.estimated_time:.0f}s). Try again shortly."
+                    except HFError:
+                        ai_reply = "⚠️ AI service unavailable. Try again."
 
         st.session_state.chat_history.append(("You", user_q))
         st.session_state.chat_history.append(("AI", ai_reply))
@@ -832,6 +607,14 @@ elif st.session_state.page == "Chatbot":
     for speaker, msg in st.session_state.chat_history:
         st.markdown(f"**{speaker}:** {msg}")
 
+    cache_stats = response_cache.stats()
+    if cache_stats["hits"]:
+        st.caption(
+            f"⚡ Answer cache: {cache_stats['hits']} repeat questions answered instantly "
+            f"({cache_stats['hit_rate']:.0%}), {cache_stats['latency_saved_s']:.0f}s and "
+            f"~{cache_stats['tokens_saved']:,} tokens saved"
+        )
+
 
 # -------------------------
 # TOTAL IMPACT PAGE
@@ -847,24 +630,28 @@ elif st.session_state.page == "Impact Dashboard":
     # =============================
     # REQUIRE HISTORY
     # =============================
-    if "impact_history" not in st.session_state or st.session_state.impact_history.empty:
+    if not session_history():
         st.info("Analyse products to start building your impact story 🌱")
         st.stop()
 
-    history = st.session_state.impact_history.copy()
+    # Read-only view of the log; nothing below modifies it
+    history = st.session_state.impact_history.frame()
+    # Running totals kept by the log as purchases are added: no full-history scans
+    stats = st.session_state.impact_history.aggregates()
+    history_store, user = load_history_store(), current_user()
 
     st.divider()
 
     # =============================
     # 🌱 BIG SUMMARY METRICS
     # =============================
-    avg_score = history["Eco Score"].mean()
-    total_score = history["Eco Score"].sum()
+    avg_score = stats["mean"]["Eco Score"]
+    total_score = stats["sum"]["Eco Score"]
 
     c1, c2, c3, c4 = st.columns(4)
     c1.metric("Average Eco Score", f"{avg_score:.1f} / 100")
-    c2.metric("Products Logged", len(history))
-    c3.metric("High-Eco Choices", (history["Eco Score"] >= 80).sum())
+    c2.metric("Products Logged", stats["count"])
+    c3.metric("High-Eco Choices", stats["high_eco"])
     c4.metric("Total Eco Score", int(total_score))
 
     st.divider()
@@ -872,9 +659,9 @@ elif st.session_state.page == "Impact Dashboard":
     # =============================
     # 🌍 HUMAN IMPACT TRANSLATION
     # =============================
-    avg_carbon = history["Carbon (kg)"].mean()
-    avg_water = history["Water (L)"].mean()
-    avg_energy = history["Energy (MJ)"].mean()
+    avg_carbon = stats["mean"]["Carbon (kg)"]
+    avg_water = stats["mean"]["Water (L)"]
+    avg_energy = stats["mean"]["Energy (MJ)"]
 
     st.markdown("## 🌍 What This Means for the Planet")
 
@@ -900,22 +687,50 @@ elif st.session_state.page == "Impact Dashboard":
     # =============================
     st.markdown("## 📈 Your EcoScore Journey")
 
-    trend_fig = px.line(
-        history.reset_index(),
-        x=history.reset_index().index,
-        y="Eco Score",
-        markers=True,
-        color_discrete_sequence=["#22c55e"]
+    # Each purchase (this session's tail), or day / week / month rollups
+    # from the history store: a handful of points whatever the range
+    trend_view = st.radio(
+        "Show", ["Each purchase", *TREND_RANGES], horizontal=True,
+        index=0 if stats["count"] <= 200 else len(TREND_RANGES),
     )
+    if trend_view == "Each purchase":
+        # At most one point per pixel (LTTB keeps the line's peaks and dips);
+        # narrow the range to see every purchase in it
+        first, last = 0, len(history) - 1
+        if len(history) > CHART_WIDTH_PX:
+            first, last = st.slider("Purchases shown", 0, last, (first, last))
+        window = history.iloc[first:last + 1]
+        points = window.iloc[lttb(window.index, window["Eco Score"])]
+        trend_fig = px.line(
+            points,
+            x=points.index,
+            y="Eco Score",
+            markers=True,
+            color_discrete_sequence=["#22c55e"]
+        )
 
-    trend_fig.update_layout(
-        xaxis_title="Order of products analysed",
-        yaxis_title="Eco Score"
-    )
+        trend_fig.update_layout(
+            xaxis_title="Order of products analysed",
+            yaxis_title="Eco Score"
+        )
+    else:
+        resolution, trend = history_store.trend(user, TREND_RANGES[trend_view])
+        trend_fig = px.line(
+            trend,
+            x="Period",
+            y="Avg Eco Score",
+            markers=True,
+            hover_data=["Products", "Carbon (kg)", "Water (L)", "Energy (MJ)"],
+            color_discrete_sequence=["#22c55e"]
+        )
+        trend_fig.update_layout(
+            xaxis_title=f"{resolution.capitalize()} (UTC)",
+            yaxis_title="Average Eco Score"
+        )
 
     st.plotly_chart(trend_fig, use_container_width=True)
-    if len(history) >= 2:
-            delta = history["Eco Score"].iloc[-1] - history["Eco Score"].iloc[0]
+    if stats["delta"] is not None:
+            delta = stats["delta"]
 
             if delta > 5:
                 st.success(f"📈 Your EcoScore improved by **{delta:.1f} points** — your choices are getting greener 🌿")
@@ -933,11 +748,11 @@ elif st.session_state.page == "Impact Dashboard":
     # =============================
     st.markdown("## 📊 What Impacts You the Most")
 
-    impact_avg = history[
-        ["Carbon (kg)", "Water (L)", "Energy (MJ)", "Waste Score"]
-    ].mean().reset_index()
-
-    impact_avg.columns = ["Impact Type", "Average Value"]
+    impact_types = ["Carbon (kg)", "Water (L)", "Energy (MJ)", "Waste Score"]
+    impact_avg = pd.DataFrame({
+        "Impact Type": impact_types,
+        "Average Value": [stats["mean"][col] for col in impact_types],
+    })
 
     impact_fig = px.bar(
         impact_avg,
@@ -964,9 +779,13 @@ elif st.session_state.page == "Impact Dashboard":
     )
 
     if len(compare_products) >= 2:
-        compare_df = history[history["Product"].isin(compare_products)]
-
         impact_cols = ["Carbon (kg)", "Water (L)", "Energy (MJ)", "Waste Score"]
+        # One bar per product however often it was logged
+        compare_df = (
+            history[history["Product"].isin(compare_products)]
+            .groupby("Product", observed=True, sort=False)[impact_cols].mean()
+            .reset_index()
+        )
         normalized = compare_df.copy()
 
         for col in impact_cols:
@@ -1007,10 +826,18 @@ elif st.session_state.page == "Impact Dashboard":
     # 📜 HISTORY TABLE
     # =============================
     st.markdown("## 📜 Your Impact Log")
-    st.dataframe(history[::-1], use_container_width=True)
+
+    # Newest first, one page at a time from the history store
+    logged = history_store.count(user)
+    if logged > stats["count"]:
+        st.caption(f"Charts above cover your latest {stats['count']:,} of {logged:,} purchases.")
+    pages = max(1, -(-logged // PAGE_ROWS))
+    page = st.number_input(f"Page (of {pages})", min_value=1, max_value=pages, value=1) if pages > 1 else 1
+    st.dataframe(history_store.page(user, page - 1), hide_index=True, use_container_width=True)
 
     if st.button("🗑️ Clear Impact History"):
-        st.session_state.impact_history = st.session_state.impact_history.iloc[0:0]
+        st.session_state.impact_history.clear()
+        history_store.clear(user)
 
         # 🔑 also reset logging guards
         if "logged_keys" in st.session_state: